@@ -1,13 +1,29 @@
 import streamlit as st
 import os
+import html
+import threading
+import time
 from pathlib import Path
-import google.generativeai as genai
 import json
 from datetime import datetime
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from io import BytesIO
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from case_cache import CaseBodyCache
+from case_store import HIGHLIGHT_END, HIGHLIGHT_START, SEARCH_CANDIDATES, CaseStore
+from disk_cache import DiskCache, hash_bytes, hash_file
+from export_jobs import BULK_EXPORT_MAX_CASES, ExportJobs, build_zip
+from exporters import EXPORT_FORMATS, export_cache_key, export_file_name, get_case_export, render_html
+from gemini_client import GeminiClient, KeyPool, parse_api_keys
+from legal_corpus import LEGAL_DOCUMENTS_DIR, LegalCorpus
+from pdf_fonts import get_font_registry
+from prompts import (CASE_STATE_MARKER, CASE_STATE_SEED_CHARS, LANGUAGES, build_analysis_prompt,
+                     build_evidence_prompt, build_precedents_prompt, parse_evidence_response)
+from response_cache import ResponseCache, make_cache_key
+from state_backend import open_state_backend
+from retrieval import retrieve_context
+from token_budget import fit_context, fit_text
 
 # Set page config - MUST BE FIRST
 st.set_page_config(
@@ -18,7 +34,8 @@ st.set_page_config(
 )
 
 # Beautiful Modern CSS with Eye-Friendly Colors
-st.markdown("""
+# Sent on full reruns only; fragment reruns below leave it untouched
+APP_CSS = """
 <style>
     /* Main App Styling */
     .stApp {
@@ -298,595 +315,273 @@ st.markdown("""
         border-top-color: #667eea !important;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(APP_CSS, unsafe_allow_html=True)
 
 # Initialize session state
-if 'analysis_result' not in st.session_state:
-    st.session_state.analysis_result = None
-if 'case_history' not in st.session_state:
-    st.session_state.case_history = []
-if 'legal_context' not in st.session_state:
-    st.session_state.legal_context = ""
-if 'documents_processed' not in st.session_state:
-    st.session_state.documents_processed = False
+# Only the current case's ID is kept; its body lives in the bounded case_bodies LRU
+if 'current_case_id' not in st.session_state:
+    st.session_state.current_case_id = None
+if 'case_bodies' not in st.session_state:
+    st.session_state.case_bodies = CaseBodyCache()
 if 'current_language' not in st.session_state:
     st.session_state.current_language = 'English'
-if 'case_id_counter' not in st.session_state:
-    st.session_state.case_id_counter = 1
-if 'saved_cases_db' not in st.session_state:
-    st.session_state.saved_cases_db = {}
 if 'api_key' not in st.session_state:
     st.session_state.api_key = ""
 if 'api_key_saved' not in st.session_state:
     st.session_state.api_key_saved = False
+if 'precedents_result' not in st.session_state:
+    st.session_state.precedents_result = None
+if 'written_uploads' not in st.session_state:
+    st.session_state.written_uploads = {}
+if 'export_jobs' not in st.session_state:
+    st.session_state.export_jobs = {}
 
-def process_pdf(pdf_path):
-    """Extract text from PDF"""
-    try:
-        import PyPDF2
-        text = ""
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page_num in range(min(30, len(pdf_reader.pages))):
-                text += pdf_reader.pages[page_num].extract_text() + "\n\n"
-        return text
-    except Exception as e:
-        return f"Error: {str(e)}"
+@st.cache_resource(max_entries=64)
+def get_gemini_client(api_key):
+    """Gemini client per API key, shared across sessions and reruns"""
+    return GeminiClient(api_key)
 
-def analyze_case(api_key, case_scenario, legal_context, language='English'):
-    """Analyze case using Gemini"""
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
-        
-        lang_instruction = ""
-        if language == 'Hindi':
-            lang_instruction = "Provide the analysis in Hindi (Devanagari script)."
-        elif language == 'Telugu':
-            lang_instruction = "Provide the analysis in Telugu (Telugu script)."
-        elif language == 'Tamil':
-            lang_instruction = "Provide the analysis in Tamil (Tamil script)."
-        
-        prompt = f"""You are an expert Indian legal analyst. {lang_instruction}
+def get_operator_keys():
+    """API keys configured by the operator via $GEMINI_API_KEYS or st.secrets"""
+    value = os.environ.get("GEMINI_API_KEYS")
+    if not value:
+        try:
+            value = st.secrets.get("GEMINI_API_KEYS")
+        except Exception:
+            # No secrets.toml configured
+            value = None
+    if isinstance(value, (list, tuple)):
+        value = ",".join(value)
+    return parse_api_keys(value or "")
 
-CASE: {case_scenario}
+@st.cache_resource
+def get_key_pool():
+    """Process-wide pool of operator keys, or None when none are configured"""
+    keys = get_operator_keys()
+    return KeyPool(keys) if keys else None
 
-LEGAL REFERENCE: {legal_context if legal_context else "Use IPC, CrPC, Evidence Act knowledge."}
+def get_llm_client(api_key):
+    """The session's own key wins; otherwise requests are balanced over the operator pool"""
+    if api_key:
+        return get_gemini_client(api_key)
+    pool = get_key_pool()
+    if pool is None:
+        raise ValueError("No Gemini API key configured")
+    return pool
 
-Provide comprehensive analysis:
+# Page sizes offered on the Case History page
+HISTORY_PAGE_SIZES = [10, 20, 50]
 
-1. CASE CLASSIFICATION
-2. RELEVANT LEGAL PROVISIONS (section numbers)
-3. PUNISHMENT DETAILS:
-   - Each applicable section
-   - Minimum punishment
-   - Maximum punishment
-   - Cognizable/Non-cognizable
-   - Bailable/Non-bailable
-4. PROSECUTION ARGUMENTS (4-5 points)
-5. DEFENSE ARGUMENTS (4-5 points)
-6. KEY LEGAL FACTORS
-7. EVIDENCE REQUIREMENTS
-8. SIMILAR PRECEDENTS
-9. RISK ASSESSMENT
+@st.cache_resource
+def get_case_store():
+    """Process-wide case repository shared by all sessions (and replicas, when a state backend is set)"""
+    return CaseStore(shared=open_state_backend())
 
-Format clearly with headings."""
+@st.cache_resource
+def get_legal_corpus():
+    """Process-wide index of the legal documents folder, shared read-only by all sessions"""
+    return LegalCorpus(LEGAL_DOCUMENTS_DIR)
 
-        response = model.generate_content(prompt)
-        
-        case_id = f"CASE-{st.session_state.case_id_counter:06d}"
-        st.session_state.case_id_counter += 1
-        
-        case_data = {
-            'case_id': case_id,
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'case_scenario': case_scenario,
-            'full_scenario': case_scenario,
-            'analysis': response.text,
-            'language': language,
-            'evidence_updates': [],
-            'version': 1,  # Track versions for permalink updates
-            'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-        st.session_state.case_history.append(case_data)
-        st.session_state.saved_cases_db[case_id] = case_data
-        
-        return response.text, case_id
-    except Exception as e:
-        return f"Error: {str(e)}", None
+@st.cache_resource
+def get_response_cache():
+    """Process-wide cache of analyses shared by all sessions"""
+    return ResponseCache()
 
-def update_with_evidence(api_key, case_id, original_analysis, new_evidence, language='English'):
-    """Update analysis with new evidence"""
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
-        
-        lang_instruction = ""
-        if language == 'Hindi':
-            lang_instruction = "Provide update in Hindi."
-        elif language == 'Telugu':
-            lang_instruction = "Provide update in Telugu."
-        elif language == 'Tamil':
-            lang_instruction = "Provide update in Tamil."
-        
-        prompt = f"""{lang_instruction}
+# Rendered PDF/Word reports, keyed by case version so updates never serve stale files
+EXPORT_CACHE_DIR = Path(".cache") / "exports"
+EXPORT_CACHE_MAX_BYTES = 100 * 1024 * 1024
+# How long a button click waits for an export before handing it to the background
+EXPORT_INLINE_WAIT_SECONDS = 0.5
+EXPORT_POLL_SECONDS = 1
 
-ORIGINAL ANALYSIS: {original_analysis}
+@st.cache_resource
+def get_export_cache():
+    """Process-wide cache of rendered export files"""
+    return DiskCache(EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_BYTES)
 
-NEW EVIDENCE: {new_evidence}
+@st.cache_resource
+def get_export_jobs():
+    """Process-wide background export queue"""
+    return ExportJobs()
 
-Analyze impact:
-1. IMPACT ASSESSMENT
-2. HOW IT AFFECTS PUNISHMENT
-3. EFFECT ON PROSECUTION
-4. EFFECT ON DEFENSE
-5. UPDATED RISK ASSESSMENT"""
+def invalidate_exports(case_id, version):
+    """Drop cached exports of one version of a case"""
+    export_cache = get_export_cache()
+    for export_format in EXPORT_FORMATS:
+        for language in LANGUAGES:
+            export_cache.delete(export_cache_key(case_id, version, export_format, language))
 
-        response = model.generate_content(prompt)
-        
-        if case_id in st.session_state.saved_cases_db:
-            # Update version number
-            st.session_state.saved_cases_db[case_id]['version'] = st.session_state.saved_cases_db[case_id].get('version', 1) + 1
-            st.session_state.saved_cases_db[case_id]['last_updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            st.session_state.saved_cases_db[case_id]['evidence_updates'].append({
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'evidence': new_evidence,
-                'impact_analysis': response.text,
-                'version': st.session_state.saved_cases_db[case_id]['version']
-            })
-        
-        return response.text
-    except Exception as e:
-        return f"Error: {str(e)}"
+class StreamInterruptedError(Exception):
+    """Raised when a streamed Gemini response stops before completing"""
 
-def search_precedents(api_key, case_scenario):
-    """Search precedents"""
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
-        
-        prompt = f"""Find similar Indian legal precedents for: {case_scenario}
+    def __init__(self, partial_text, cause):
+        super().__init__(f"Response was interrupted: {cause}")
+        self.partial_text = partial_text
 
-List 5-7 relevant precedents with:
-1. Case name
-2. Year
-3. Court
-4. Key principle
-5. Relevance"""
+def generate_text(client, prompt, placeholder=None, hide_after=None, usage=None):
+    """Generate a response, streaming it into placeholder when one is given
 
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"Error: {str(e)}"
+    Anything from the ``hide_after`` marker on is returned but not displayed.
+    ``usage`` is filled with token counts as in GeminiClient.generate.
+    """
+    if placeholder is None:
+        return client.generate(prompt, usage=usage)
 
-def load_case_by_id(case_id):
-    """Load case by ID"""
-    if case_id in st.session_state.saved_cases_db:
-        return st.session_state.saved_cases_db[case_id]
-    return None
+    text = ""
+    try:
+        for chunk in client.generate(prompt, stream=True, usage=usage):
+            text += chunk
+            visible = text.split(hide_after)[0] if hide_after else text
+            # Only render complete lines so half-written markdown doesn't flicker
+            complete = visible[:visible.rfind("\n") + 1]
+            if complete:
+                placeholder.markdown(complete + " ▌")
+    except Exception as e:
+        placeholder.markdown(text.split(hide_after)[0] if hide_after else text)
+        raise StreamInterruptedError(text, e) from e
+    placeholder.markdown(text.split(hide_after)[0] if hide_after else text)
+    return text
 
-def export_to_pdf(case_scenario, analysis, case_id):
-    """Generate PDF report with Unicode support"""
+def analyze_case(api_key, case_scenario, legal_context, language='English', placeholder=None,
+                 use_cache=True):
+    """Analyze case using Gemini, reusing a cached analysis for repeat requests"""
     try:
-        from reportlab.lib.pagesizes import letter, A4
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from reportlab.lib import colors
-        from reportlab.pdfbase import pdfmetrics
-        from reportlab.pdfbase.ttfonts import TTFont
-        
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(
-            buffer, 
-            pagesize=A4, 
-            topMargin=0.5*inch, 
-            bottomMargin=0.5*inch,
-            leftMargin=0.75*inch,
-            rightMargin=0.75*inch
-        )
-        
-        # Register Unicode fonts for Telugu/Hindi support
-        try:
-            # Try to use system fonts that support Unicode
-            pdfmetrics.registerFont(TTFont('Telugu', 'NotoSansTelugu-Regular.ttf'))
-            pdfmetrics.registerFont(TTFont('Hindi', 'NotoSansDevanagari-Regular.ttf'))
-            font_name = 'Telugu'
-        except:
-            # Fallback to default font
-            font_name = 'Helvetica'
-        
-        styles = getSampleStyleSheet()
-        story = []
-        
-        # Custom styles with Unicode support
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#667eea'),
-            spaceAfter=20,
-            alignment=1,  # Center
-            fontName=font_name
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=14,
-            textColor=colors.HexColor('#764ba2'),
-            spaceAfter=10,
-            spaceBefore=15,
-            fontName=font_name,
-            leading=20
-        )
-        
-        normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=styles['Normal'],
-            fontSize=11,
-            fontName=font_name,
-            leading=16,
-            spaceAfter=8
-        )
-        
-        # Add gradient header box
-        header_data = [[Paragraph("Legal Case Analysis Report", title_style)]]
-        header_table = Table(header_data, colWidths=[6.5*inch])
-        header_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#667eea')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('TOPPADDING', (0, 0), (-1, -1), 20),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 20),
-        ]))
-        story.append(header_table)
-        story.append(Spacer(1, 20))
-        
-        # Case Information Box
-        info_data = [
-            [Paragraph(f"<b>Case ID:</b> {case_id}", normal_style),
-             Paragraph(f"<b>Date:</b> {datetime.now().strftime('%d-%m-%Y %H:%M')}", normal_style)]
-        ]
-        info_table = Table(info_data, colWidths=[3.25*inch, 3.25*inch])
-        info_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f0f9ff')),
-            ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#667eea')),
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-            ('LEFTPADDING', (0, 0), (-1, -1), 10),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-        ]))
-        story.append(info_table)
-        story.append(Spacer(1, 20))
-        
-        # Case Scenario Section
-        story.append(Paragraph("Case Scenario", heading_style))
-        # Clean and encode text properly
-        clean_scenario = case_scenario.encode('utf-8', errors='ignore').decode('utf-8')
-        for para in clean_scenario.split('\n'):
-            if para.strip():
-                story.append(Paragraph(para, normal_style))
-        story.append(Spacer(1, 20))
-        
-        # Analysis Section
-        story.append(Paragraph("Legal Analysis", heading_style))
-        
-        # Clean and format analysis text
-        clean_analysis = analysis.encode('utf-8', errors='ignore').decode('utf-8')
-        
-        # Split by lines and format
-        for line in clean_analysis.split('\n'):
-            line = line.strip()
-            if not line:
-                story.append(Spacer(1, 6))
-                continue
-            
-            # Check if it's a heading (starts with ** or #)
-            if line.startswith('**') and line.endswith('**'):
-                heading_text = line.replace('**', '').strip()
-                story.append(Paragraph(heading_text, heading_style))
-            elif line.startswith('#'):
-                heading_text = line.replace('#', '').strip()
-                story.append(Paragraph(heading_text, heading_style))
-            elif line.startswith('*') or line.startswith('-'):
-                # Bullet point
-                bullet_text = line.lstrip('*- ').strip()
-                bullet_para = Paragraph(f"• {bullet_text}", normal_style)
-                story.append(bullet_para)
-            elif line.startswith(('1.', '2.', '3.', '4.', '5.', '6.', '7.', '8.', '9.')):
-                # Numbered list
-                story.append(Paragraph(line, normal_style))
-            else:
-                # Regular paragraph
-                story.append(Paragraph(line, normal_style))
-        
-        story.append(Spacer(1, 30))
-        
-        # Footer
-        footer_data = [[Paragraph("<i>Generated by LegalMitra - Your AI Legal Assistant | Powered by Google Gemini 2.5 Flash</i>", 
-                                  ParagraphStyle('Footer', parent=styles['Normal'], 
-                                               fontSize=9, textColor=colors.grey, alignment=1))]]
-        footer_table = Table(footer_data, colWidths=[6.5*inch])
-        footer_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ]))
-        story.append(footer_table)
+        client = get_llm_client(api_key)
+        
+        # Lower-ranked passages are dropped first when the prompt is over budget
+        prompt, legal_context, _ = fit_context(
+            lambda context: build_analysis_prompt(case_scenario, context, language),
+            legal_context, 'analysis')
+        
+        response_cache = get_response_cache()
+        cache_key = make_cache_key(case_scenario, legal_context, language, client.model_name)
+        analysis = response_cache.get(cache_key) if use_cache else None
+        # A cached answer costs nothing, so it records no tokens
+        usage = {'input_tokens': 0, 'output_tokens': 0}
+        if analysis is not None:
+            if placeholder is not None:
+                placeholder.markdown(analysis)
+        else:
+            analysis = generate_text(client, prompt, placeholder, usage=usage)
+            response_cache.set(cache_key, analysis)
         
-        # Build PDF
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+        case_data = get_case_store().create_case(case_scenario, analysis, language, **usage)
         
+        return analysis, case_data['case_id']
     except Exception as e:
-        st.error(f"PDF Error: {str(e)}")
-        st.info("💡 For Telugu/Hindi support, the system needs Unicode fonts. PDF generated with available fonts.")
-        return None
+        return f"Error: {str(e)}", None
 
-def export_to_word(case_scenario, analysis, case_id):
-    """Generate Word document with full Unicode support and proper table formatting"""
+def update_with_evidence(api_key, case_id, original_analysis, new_evidence, language='English', placeholder=None):
+    """Update analysis with new evidence"""
     try:
-        from docx import Document
-        from docx.shared import Inches, Pt, RGBColor
-        from docx.enum.text import WD_ALIGN_PARAGRAPH
-        from docx.oxml.ns import qn
-        from docx.oxml import OxmlElement
-        from docx.table import _Cell
-        
-        doc = Document()
-        
-        # Set default font to support Unicode (especially Telugu/Hindi/Tamil)
-        style = doc.styles['Normal']
-        font = style.font
-        font.name = 'Noto Sans'  # Universal font for multiple scripts
-        font.size = Pt(12)
-        
-        # Fallback fonts for better compatibility
-        rPr = style.element.rPr
-        rFonts = rPr.rFonts
-        rFonts.set(qn('w:ascii'), 'Noto Sans')
-        rFonts.set(qn('w:hAnsi'), 'Noto Sans')
-        rFonts.set(qn('w:eastAsia'), 'Noto Sans')
-        rFonts.set(qn('w:cs'), 'Noto Sans')  # Complex scripts
-        
-        def set_cell_background(cell, fill_color):
-            """Set cell background color"""
-            shading_elm = OxmlElement('w:shd')
-            shading_elm.set(qn('w:fill'), fill_color)
-            cell._element.get_or_add_tcPr().append(shading_elm)
-        
-        # Add gradient-like header
-        header = doc.add_heading('', 0)
-        header_run = header.add_run('⚖️ Legal Case Analysis Report')
-        header_run.font.size = Pt(24)
-        header_run.font.color.rgb = RGBColor(102, 126, 234)
-        header_run.bold = True
-        header.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        
-        # Add some space
-        doc.add_paragraph()
-        
-        # Case Information Table
-        info_table = doc.add_table(rows=3, cols=2)
-        info_table.style = 'Light Grid Accent 1'
-        
-        # Header row
-        hdr_cells = info_table.rows[0].cells
-        hdr_cells[0].text = 'Case Information'
-        hdr_cells[0].merge(hdr_cells[1])
-        hdr_cells[0].paragraphs[0].runs[0].font.bold = True
-        hdr_cells[0].paragraphs[0].runs[0].font.size = Pt(14)
-        hdr_cells[0].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-        set_cell_background(hdr_cells[0], '667eea')
-        hdr_cells[0].paragraphs[0].runs[0].font.color.rgb = RGBColor(255, 255, 255)
-        
-        # Case ID row
-        row1_cells = info_table.rows[1].cells
-        row1_cells[0].text = 'Case ID:'
-        row1_cells[0].paragraphs[0].runs[0].font.bold = True
-        row1_cells[1].text = case_id
-        
-        # Date row
-        row2_cells = info_table.rows[2].cells
-        row2_cells[0].text = 'Date Generated:'
-        row2_cells[0].paragraphs[0].runs[0].font.bold = True
-        row2_cells[1].text = datetime.now().strftime('%d-%m-%Y %H:%M')
-        
-        # Set font for all cells
-        for row in info_table.rows:
-            for cell in row.cells:
-                for paragraph in cell.paragraphs:
-                    for run in paragraph.runs:
-                        run.font.name = 'Noto Sans'
-        
-        doc.add_paragraph()
-        
-        # Case Scenario Section
-        doc.add_heading('Case Scenario', level=1)
-        scenario_heading = doc.paragraphs[-1]
-        scenario_heading.runs[0].font.color.rgb = RGBColor(118, 75, 162)
-        
-        # Add scenario with proper encoding
-        scenario_para = doc.add_paragraph(case_scenario)
-        for run in scenario_para.runs:
-            run.font.name = 'Noto Sans'
-        
-        doc.add_paragraph()
-        
-        # Analysis
-        doc.add_heading('Legal Analysis', level=1)
-        analysis_heading = doc.paragraphs[-1]
-        analysis_heading.runs[0].font.color.rgb = RGBColor(118, 75, 162)
-        
-        # Parse and format analysis with table detection
-        lines = analysis.split('\n')
-        i = 0
-        in_table = False
-        table_data = []
-        
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            if not line:
-                i += 1
-                continue
-            
-            # Check if line looks like a table (contains | or multiple columns)
-            if '|' in line and line.count('|') >= 2:
-                # Start collecting table data
-                if not in_table:
-                    in_table = True
-                    table_data = []
-                
-                # Parse table row
-                cells = [cell.strip() for cell in line.split('|')]
-                cells = [cell for cell in cells if cell]  # Remove empty cells
-                
-                if cells:
-                    table_data.append(cells)
-                
-                i += 1
-                
-                # Check if next line is still part of table
-                if i < len(lines):
-                    next_line = lines[i].strip()
-                    if '|' not in next_line or next_line.count('|') < 2:
-                        # End of table, create it
-                        if len(table_data) > 0:
-                            # Create table
-                            max_cols = max(len(row) for row in table_data)
-                            table = doc.add_table(rows=len(table_data), cols=max_cols)
-                            table.style = 'Light Grid Accent 1'
-                            
-                            # Fill table
-                            for row_idx, row_data in enumerate(table_data):
-                                for col_idx, cell_data in enumerate(row_data):
-                                    if col_idx < max_cols:
-                                        cell = table.rows[row_idx].cells[col_idx]
-                                        cell.text = cell_data
-                                        
-                                        # Format header row
-                                        if row_idx == 0:
-                                            cell.paragraphs[0].runs[0].font.bold = True
-                                            set_cell_background(cell, 'e0e7ff')
-                                        
-                                        # Set font
-                                        for paragraph in cell.paragraphs:
-                                            for run in paragraph.runs:
-                                                run.font.name = 'Noto Sans'
-                                                run.font.size = Pt(11)
-                            
-                            doc.add_paragraph()
-                        
-                        in_table = False
-                        table_data = []
-                continue
-            else:
-                # Not a table line
-                if in_table:
-                    # End previous table
-                    if len(table_data) > 0:
-                        max_cols = max(len(row) for row in table_data)
-                        table = doc.add_table(rows=len(table_data), cols=max_cols)
-                        table.style = 'Light Grid Accent 1'
-                        
-                        for row_idx, row_data in enumerate(table_data):
-                            for col_idx, cell_data in enumerate(row_data):
-                                if col_idx < max_cols:
-                                    cell = table.rows[row_idx].cells[col_idx]
-                                    cell.text = cell_data
-                                    
-                                    if row_idx == 0:
-                                        cell.paragraphs[0].runs[0].font.bold = True
-                                        set_cell_background(cell, 'e0e7ff')
-                                    
-                                    for paragraph in cell.paragraphs:
-                                        for run in paragraph.runs:
-                                            run.font.name = 'Noto Sans'
-                                            run.font.size = Pt(11)
-                        
-                        doc.add_paragraph()
-                    
-                    in_table = False
-                    table_data = []
-                
-                # Regular text formatting
-                # Headings
-                if line.startswith('**') and line.endswith('**'):
-                    heading_text = line.replace('**', '').strip()
-                    h = doc.add_heading(heading_text, level=2)
-                    h.runs[0].font.color.rgb = RGBColor(102, 126, 234)
-                    for run in h.runs:
-                        run.font.name = 'Noto Sans'
-                elif line.startswith('#'):
-                    heading_text = line.replace('#', '').strip()
-                    h = doc.add_heading(heading_text, level=2)
-                    h.runs[0].font.color.rgb = RGBColor(102, 126, 234)
-                    for run in h.runs:
-                        run.font.name = 'Noto Sans'
-                # Bullet points
-                elif line.startswith('*') or line.startswith('-'):
-                    bullet_text = line.lstrip('*- ').strip()
-                    para = doc.add_paragraph(bullet_text, style='List Bullet')
-                    for run in para.runs:
-                        run.font.name = 'Noto Sans'
-                # Numbered lists
-                elif line[0].isdigit() and '.' in line[:3]:
-                    para = doc.add_paragraph(line, style='List Number')
-                    for run in para.runs:
-                        run.font.name = 'Noto Sans'
-                # Regular paragraphs
-                else:
-                    para = doc.add_paragraph(line)
-                    for run in para.runs:
-                        run.font.name = 'Noto Sans'
-                
-                i += 1
-        
-        # Handle any remaining table data
-        if in_table and len(table_data) > 0:
-            max_cols = max(len(row) for row in table_data)
-            table = doc.add_table(rows=len(table_data), cols=max_cols)
-            table.style = 'Light Grid Accent 1'
-            
-            for row_idx, row_data in enumerate(table_data):
-                for col_idx, cell_data in enumerate(row_data):
-                    if col_idx < max_cols:
-                        cell = table.rows[row_idx].cells[col_idx]
-                        cell.text = cell_data
-                        
-                        if row_idx == 0:
-                            cell.paragraphs[0].runs[0].font.bold = True
-                            set_cell_background(cell, 'e0e7ff')
-                        
-                        for paragraph in cell.paragraphs:
-                            for run in paragraph.runs:
-                                run.font.name = 'Noto Sans'
-                                run.font.size = Pt(11)
-        
-        # Footer
-        doc.add_paragraph()
-        doc.add_paragraph()
-        footer = doc.add_paragraph("Generated by LegalMitra | Powered by Google Gemini 2.5 Flash")
-        footer.runs[0].italic = True
-        footer.runs[0].font.size = Pt(9)
-        footer.runs[0].font.color.rgb = RGBColor(128, 128, 128)
-        footer.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        client = get_llm_client(api_key)
+        store = get_case_store()
+        
+        # The rolling summary stands in for the analysis and all earlier updates
+        case_summary = store.get_summary(case_id)
+        case_state = case_summary or original_analysis[:CASE_STATE_SEED_CHARS]
+        # Indic text costs more tokens per character, so the case state is clipped to fit
+        # the budget; the summary's newest evidence is at its end
+        prompt, case_state, _ = fit_text(
+            lambda state: build_evidence_prompt(state, new_evidence, language),
+            case_state, 'evidence', keep_end=bool(case_summary))
+        
+        usage = {'input_tokens': 0, 'output_tokens': 0}
+        response = generate_text(client, prompt, placeholder, hide_after=CASE_STATE_MARKER, usage=usage)
+        impact_analysis, case_summary = parse_evidence_response(response, case_state, new_evidence)
+        
+        # Bumps the case version so permalinks point at the updated analysis
+        version = store.add_evidence_update(case_id, new_evidence, impact_analysis, case_summary, **usage)
+        if version:
+            invalidate_exports(case_id, version - 1)
+        
+        return impact_analysis
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+def search_precedents(api_key, case_scenario, placeholder=None):
+    """Search precedents"""
+    try:
+        client = get_llm_client(api_key)
         
-        # Save to buffer
-        buffer = BytesIO()
-        doc.save(buffer)
-        buffer.seek(0)
-        return buffer
+        # A scenario within the analysis budget can be over this smaller one; its head is enough here
+        prompt, _, _ = fit_text(build_precedents_prompt, case_scenario, 'precedents')
         
+        return generate_text(client, prompt, placeholder)
+    except StreamInterruptedError as e:
+        # Precedents are not stored, so a partial list is still worth showing
+        text = e.partial_text + "\n\n⚠️ *The response was cut off; this list may be incomplete.*"
+        placeholder.markdown(text)
+        return text
     except Exception as e:
-        st.error(f"Word Error: {str(e)}")
-        return None
+        return f"Error: {str(e)}"
+
+def start_export(job_key, fn, *args):
+    """Queue an export job for this session, briefly waiting so quick ones show at once"""
+    jobs = get_export_jobs()
+    previous_job = st.session_state.export_jobs.get(job_key)
+    if previous_job is not None:
+        # Frees a replaced bulk ZIP now rather than when it expires
+        jobs.discard(previous_job)
+    job_id = jobs.submit(fn, *args)
+    st.session_state.export_jobs[job_key] = job_id
+    jobs.wait(job_id, EXPORT_INLINE_WAIT_SECONDS)
+
+def export_case_file(store, export_cache, export_format, case_id):
+    """(file name, bytes) of one stored case, for bulk export"""
+    case_data = store.get_case(case_id)
+    if case_data is None:
+        raise ValueError(f"case {case_id} not found")
+    return export_file_name(case_data, export_format), get_case_export(case_data, export_format, export_cache)
+
+@st.fragment(run_every=EXPORT_POLL_SECONDS)
+def poll_export_job(job_id):
+    """Re-check a running export every second without rerunning the whole page"""
+    if get_export_jobs().status(job_id) in ('queued', 'running'):
+        st.info("⏳ Rendering in the background - you can keep using LegalMitra meanwhile...")
+    else:
+        st.rerun()
+
+def show_export_job(job_key, label, file_name, mime, success_message=None):
+    """Show a session's export job: progress while running, then its download button"""
+    job_id = st.session_state.export_jobs.get(job_key)
+    if job_id is None:
+        return
+    jobs = get_export_jobs()
+    status = jobs.status(job_id)
+    if status in ('queued', 'running'):
+        poll_export_job(job_id)
+    elif status == 'done':
+        result = jobs.result(job_id)
+        if isinstance(result, Path):
+            # Bulk ZIPs wait on disk; Streamlit reads the file only while the button is shown
+            try:
+                with open(result, 'rb') as file:
+                    st.download_button(label=label, data=file, file_name=file_name, mime=mime,
+                                       use_container_width=True)
+            except FileNotFoundError:
+                del st.session_state.export_jobs[job_key]
+                return
+        else:
+            st.download_button(label=label, data=result, file_name=file_name, mime=mime,
+                               use_container_width=True)
+        if success_message:
+            st.success(success_message)
+    elif status == 'failed':
+        try:
+            jobs.result(job_id)
+        except Exception as e:
+            st.error(f"❌ Export failed: {str(e)}")
+        del st.session_state.export_jobs[job_key]
+    else:
+        # Expired from the queue; the user can simply generate it again
+        del st.session_state.export_jobs[job_key]
 
 def generate_visual_charts(analysis_text):
     """Generate visualization data from analysis"""
+    import pandas as pd
+    
     # Parse analysis to extract data for charts
     risk_data = {
         'Prosecution Strength': 70,
@@ -908,18 +603,451 @@ def generate_visual_charts(analysis_text):
     
     return risk_data, evidence_data, timeline_data
 
+# Public address of the app for permalinks, e.g. https://legalmitra.example.com/
+# (defaults to the address the browser used)
+PERMALINK_BASE_URL = os.environ.get("LEGALMITRA_BASE_URL", "")
+
 def get_case_permalink(case_id, version=1):
-    """Generate unique permalink with version"""
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    return f"legalmitra://case/{case_id}/v{version}/{timestamp}"
+    """HTTP permalink to a version of a case; opening it loads the case"""
+    base_url = PERMALINK_BASE_URL or (st.context.url or "").split("?")[0]
+    return f"{base_url}?{urlencode({'case': case_id, 'v': version})}"
+
+def set_case_query_params(case_id, version):
+    """Point the browser's address bar at the permalink of the case being shown"""
+    st.query_params.from_dict({'case': case_id, 'v': str(version)})
+
+def open_case_from_query_params():
+    """Make a permalink's case the current case when the page is opened with one"""
+    case_id = st.query_params.get('case')
+    if not case_id or case_id == st.session_state.current_case_id:
+        return
+    # Indexed lookup on the unique case_id; the body is only loaded when displayed
+    if get_case_store().get_version(case_id) is None:
+        st.warning(f"⚠️ Case {case_id} from the link was not found.")
+        return
+    st.session_state.current_case_id = case_id
+    st.session_state.precedents_result = None
+
+def viewed_version(case):
+    """The version the address bar asks for, or the latest one"""
+    requested = st.query_params.get('v', "") if st.query_params.get('case') == case['case_id'] else ""
+    if requested.isdigit() and 1 <= int(requested) <= case['version']:
+        return int(requested)
+    return case['version']
+
+# Shared across sessions: a popular link is rendered once per version, not once per visit
+@st.cache_data(max_entries=256, show_spinner=False)
+def render_case_html(case_id, version):
+    """HTML of a case's analysis and its evidence updates up to version"""
+    case = get_case_store().get_case(case_id)
+    if case is None:
+        return ""
+    parts = [render_html(case['analysis'])]
+    updates = [update for update in case['evidence_updates'] if update['version'] <= version]
+    if updates:
+        parts.append("<h3>🔎 Evidence Updates</h3>")
+    for idx, update in enumerate(updates, 1):
+        parts.append(f"<h4>Update #{idx} - {html.escape(update['timestamp'])}</h4>")
+        parts.append(f"<p><strong>Evidence:</strong> {html.escape(update['evidence'])}</p>")
+        parts.append(render_html(update['impact_analysis']))
+    return "\n".join(parts)
+
+def analyze_with_precedents(api_key, case_scenario, legal_context, language='English', use_cache=True):
+    """Run case analysis and precedent search concurrently
+
+    Returns (analysis, case_id, precedents); wall-clock time is that of the
+    slower request rather than the sum of both.
+    """
+    ctx = get_script_run_ctx()
+    
+    def run(func, *args, **kwargs):
+        # Worker threads share the session's script context so cached resources work as usual
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return func(*args, **kwargs)
+    
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        analysis_future = executor.submit(run, analyze_case, api_key, case_scenario,
+                                          legal_context, language, use_cache=use_cache)
+        precedents_future = executor.submit(run, search_precedents, api_key, case_scenario)
+        analysis, case_id = analysis_future.result()
+        precedents = precedents_future.result()
+    return analysis, case_id, precedents
 
 def load_case_by_id(case_id):
-    """Load case from database by ID"""
-    if case_id in st.session_state.saved_cases_db:
-        return st.session_state.saved_cases_db[case_id]
-    return None
+    """Load case by ID, from this session's recently viewed cases while still current"""
+    case_id = case_id.strip()
+    store = get_case_store()
+    version = store.get_version(case_id)
+    if version is None:
+        return None
+    case_bodies = st.session_state.case_bodies
+    case = case_bodies.get(case_id, version)
+    if case is None:
+        # Never viewed, evicted, or updated since: read it back from the case store
+        case = store.get_case(case_id)
+        if case:
+            case_bodies.put(case_id, case)
+    return case
+
+def get_current_case():
+    """The session's current case record, or None"""
+    if not st.session_state.current_case_id:
+        return None
+    return load_case_by_id(st.session_state.current_case_id)
+
+def session_memory_bytes():
+    """Approximate bytes of case text this session holds in memory"""
+    return st.session_state.case_bodies.bytes + len((st.session_state.precedents_result or "").encode('utf-8'))
+
+def highlight_snippet(snippet):
+    """Escape a search snippet and turn its match markers into <mark> tags"""
+    # Snippets span analysis headings and lines; flatten them so they render as one line
+    escaped = html.escape(" ".join(snippet.split()))
+    return escaped.replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_END, "</mark>")
+
+# A fragment so opening one card's details does not rerun the whole history page
+@st.fragment
+def render_case_card(case, snippet=None):
+    """Render a case summary card; the full analysis is only loaded when opened"""
+    case_version = case.get('version', 1)
+    permalink = get_case_permalink(case['case_id'], case_version)
+    last_updated = case.get('last_updated', case['timestamp'])
+
+    st.markdown(f"""
+    <div class="case-card">
+        <h3>{case['case_id']} <span style="color: #667eea;">v{case_version}</span></h3>
+        <p><strong>📅 Created:</strong> {case['timestamp']}</p>
+        <p><strong>🔄 Last Updated:</strong> {last_updated}</p>
+        <p><strong>🌐 Language:</strong> {html.escape(case['language'])}</p>
+        <p><strong>🔗 Permalink:</strong> <a href="{html.escape(permalink)}" target="_self">{html.escape(permalink)}</a></p>
+        <p><strong>📋 Scenario:</strong> {html.escape(case['case_scenario'][:150])}...</p>
+        {f'<p><strong>🔎 Evidence Updates:</strong> {case["evidence_count"]}</p>' if case['evidence_count'] else ''}
+        <p><strong>🔢 Tokens:</strong> {case['input_tokens']:,} in / {case['output_tokens']:,} out</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    if snippet:
+        st.markdown(f"🔎 {highlight_snippet(snippet)}", unsafe_allow_html=True)
+
+    # A toggle rather than an expander: expander bodies are always rendered and
+    # sent to the browser, while this fetches the analysis only when switched on
+    if st.toggle("📖 View Details", key=f"details_{case['case_id']}"):
+        case = load_case_by_id(case['case_id'])
+        with st.container(border=True):
+            st.markdown("### Analysis:")
+            st.markdown(case['analysis'])
+            
+            if case['evidence_updates']:
+                st.markdown("### Evidence Updates:")
+                for idx, update in enumerate(case['evidence_updates'], 1):
+                    st.markdown(f"**Update #{idx}** - {update['timestamp']}")
+                    st.markdown(f"*Evidence:* {update['evidence']}")
+                    st.markdown(f"*Impact:* {update['impact_analysis']}")
+                    st.markdown("---")
+
+# Analyze page panels are fragments so typing and clicking in one of them
+# does not rerun the rest of the page
+@st.fragment
+def load_case_panel():
+    """Load a saved case by ID and show it"""
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        case_id_input = st.text_input("🔗 Load Case by ID", 
+                                      placeholder="e.g., CASE-01JB2Y7Q3M8F4K6T0R9W5X1N2P")
+    with col2:
+        st.markdown("<br>", unsafe_allow_html=True)
+        if st.button("📂 Load", use_container_width=True):
+            if case_id_input:
+                loaded_case = load_case_by_id(case_id_input)
+                if loaded_case:
+                    st.markdown(f"""
+                    <div class="feature-card">
+                        <h3>✅ Case Loaded: {html.escape(case_id_input)}</h3>
+                        <p><strong>Date:</strong> {loaded_case['timestamp']}</p>
+                        <p><strong>Language:</strong> {html.escape(loaded_case['language'])}</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+    
+                    st.markdown("""<div class="analysis-box">""", unsafe_allow_html=True)
+                    st.markdown(f"**Scenario:** {loaded_case['full_scenario']}")
+                    st.markdown("---")
+                    st.markdown(loaded_case['analysis'])
+                    st.markdown("""</div>""", unsafe_allow_html=True)
+    
+                    if loaded_case['evidence_updates']:
+                        st.markdown("### 🔎 Evidence History")
+                        for idx, update in enumerate(loaded_case['evidence_updates'], 1):
+                            with st.expander(f"Update #{idx} - {update['timestamp']}"):
+                                st.markdown(f"**Evidence:** {update['evidence']}")
+                                st.markdown(f"**Impact:** {update['impact_analysis']}")
+                else:
+                    st.error("❌ Case not found!")
+
+@st.fragment
+def new_case_form(api_key, language, stream_responses, bypass_cache):
+    """Scenario input with the analyze and precedent buttons"""
+    st.markdown("### 📝 New Case Analysis")
+    case_scenario = st.text_area("Enter case details:", 
+                                 height=200,
+                                 placeholder="Describe the case with all relevant facts, dates, parties, and circumstances...")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        analyze_clicked = st.button("🔍 Analyze", type="primary", use_container_width=True)
+    
+    with col2:
+        precedents_clicked = st.button("📖 Precedents", use_container_width=True)
+    
+    with col3:
+        combined_clicked = st.button("⚡ Analyze + Precedents", use_container_width=True,
+                                     help="Run the analysis and precedent search at the same time")
+    
+    with col4:
+        if st.session_state.current_case_id:
+            if st.button("📊 Visualize", use_container_width=True):
+                st.session_state['navigate_to_visual'] = True
+                st.info("👉 Please go to '📊 Visual Reports' section in the sidebar to view charts!")
+    
+    # Results are rendered below the buttons so streamed text gets the full page width
+    if analyze_clicked and case_scenario:
+        legal_context = retrieve_context(get_legal_corpus().current(), case_scenario)
+        if stream_responses:
+            st.markdown("""<div class="analysis-box">""", unsafe_allow_html=True)
+            analysis, case_id = analyze_case(api_key, case_scenario, legal_context,
+                                             language, placeholder=st.empty(),
+                                             use_cache=not bypass_cache)
+            st.markdown("""</div>""", unsafe_allow_html=True)
+        else:
+            with st.spinner("🤖 AI is analyzing..."):
+                analysis, case_id = analyze_case(api_key, case_scenario,
+                                                legal_context,
+                                                language,
+                                                use_cache=not bypass_cache)
+        if case_id:
+            st.session_state.current_case_id = case_id
+            st.session_state.precedents_result = None
+            set_case_query_params(case_id, 1)
+            st.rerun()
+        else:
+            st.error(f"❌ {analysis}")
+    
+    if combined_clicked and case_scenario:
+        legal_context = retrieve_context(get_legal_corpus().current(), case_scenario)
+        with st.spinner("🤖 Analyzing case and searching precedents..."):
+            analysis, case_id, precedents = analyze_with_precedents(
+                api_key, case_scenario, legal_context, language, use_cache=not bypass_cache)
+        if case_id:
+            st.session_state.current_case_id = case_id
+            st.session_state.precedents_result = precedents
+            set_case_query_params(case_id, 1)
+            st.rerun()
+        else:
+            st.error(f"❌ {analysis}")
+    
+    if precedents_clicked and case_scenario:
+        st.markdown("""<div class="analysis-box">""", unsafe_allow_html=True)
+        st.markdown("### 📚 Similar Precedents")
+        if stream_responses:
+            precedents = search_precedents(api_key, case_scenario, placeholder=st.empty())
+            if precedents.startswith("Error:"):
+                st.error(f"❌ {precedents}")
+        else:
+            with st.spinner("Searching..."):
+                precedents = search_precedents(api_key, case_scenario)
+            st.markdown(precedents)
+        st.markdown("""</div>""", unsafe_allow_html=True)
+
+@st.fragment
+def evidence_panel(api_key, language, stream_responses):
+    """Add evidence to the current case and show its impact"""
+    st.markdown("---")
+    st.markdown("### 🔎 Add Evidence/Document")
+    
+    new_evidence = st.text_area("Enter new evidence or witness statement:",
+                               height=150,
+                               placeholder="Example: New CCTV footage shows...")
+    
+    if st.button("🔄 Update Analysis", type="secondary"):
+        current_case = get_current_case()
+        if new_evidence and current_case:
+            st.markdown("""<div class="analysis-box">""", unsafe_allow_html=True)
+            st.markdown("### 🔄 Impact Analysis")
+            if stream_responses:
+                update = update_with_evidence(api_key,
+                                             current_case['case_id'],
+                                             current_case['analysis'],
+                                             new_evidence,
+                                             language,
+                                             placeholder=st.empty())
+            else:
+                with st.spinner("🤖 Analyzing evidence..."):
+                    update = update_with_evidence(api_key,
+                                                 current_case['case_id'],
+                                                 current_case['analysis'],
+                                                 new_evidence,
+                                                 language)
+                st.markdown(update)
+            st.markdown("""</div>""", unsafe_allow_html=True)
+    
+            if update.startswith("Error:"):
+                st.error(f"❌ {update} - the evidence update was not saved.")
+            else:
+                # The permalink above belongs to the outer page and keeps the old version until its next rerun
+                case_version = get_case_store().get_version(current_case['case_id'])
+                set_case_query_params(current_case['case_id'], case_version)
+                st.success(f"✅ Evidence analyzed! Case is now at version {case_version}.")
+                st.info("💡 Add more evidence by entering new details above!")
+
+# Visual Reports controls: (widget key, label, chart label, default)
+CASE_STAGES = [
+    ("incident", "Incident Occurred", "Incident", True),
+    ("fir", "FIR Filed", "FIR Filed", True),
+    ("investigation", "Investigation", "Investigation", False),
+    ("arrest", "Arrest Made", "Arrest", False),
+    ("chargesheet", "Charge Sheet Filed", "Charge Sheet", False),
+    ("trial", "Trial Commenced", "Trial", False),
+]
+EVIDENCE_SLIDERS = [
+    ("doc_ev", "Documentary Evidence", "Documentary", 40),
+    ("wit_ev", "Witness Testimony", "Witness Testimony", 30),
+    ("phy_ev", "Physical Evidence", "Physical Evidence", 20),
+    ("dig_ev", "Digital Evidence", "Digital Evidence", 10),
+]
+STRENGTH_DEFAULTS = {'pros_strength': 70, 'def_strength': 30}
+CHART_LAYOUT = dict(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(color='#1f2937'), height=400)
+
+def level_of(value, high, medium):
+    return "High" if value > high else "Medium" if value > medium else "Low"
+
+def metric_card(label, value, detail, color):
+    st.markdown(f"""
+    <div class="metric-card" style="background: linear-gradient(135deg, {color} 0%, {color} 100%);">
+        <div class="metric-label">{label}</div>
+        <div class="metric-value">{value}</div>
+        <div class="metric-label">{detail}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+# Each chart is a fragment: moving one of its sliders reruns only that chart
+@st.fragment
+def strength_chart():
+    """Prosecution vs defense bar chart with its sliders and risk cards"""
+    import plotly.graph_objects as go
+    
+    prosecution_strength = st.slider("Prosecution Strength", 0, 100, STRENGTH_DEFAULTS['pros_strength'],
+                                     key="pros_strength", help="Set prosecution strength percentage")
+    defense_strength = st.slider("Defense Strength", 0, 100, STRENGTH_DEFAULTS['def_strength'],
+                                 key="def_strength", help="Set defense strength percentage")
+    risk_data = {
+        'Prosecution Strength': prosecution_strength,
+        'Defense Strength': defense_strength
+    }
+    fig = go.Figure(data=[
+        go.Bar(
+            x=list(risk_data.keys()),
+            y=list(risk_data.values()),
+            marker_color=['#ef4444', '#22c55e'],
+            text=[f"{v}%" for v in risk_data.values()],
+            textposition='auto',
+        )
+    ])
+    fig.update_layout(title="Prosecution vs Defense Strength", yaxis_title="Strength (%)", **CHART_LAYOUT)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    pros_risk = level_of(prosecution_strength, 60, 30)
+    def_strength_level = level_of(defense_strength, 60, 30)
+    col1, col2 = st.columns(2)
+    with col1:
+        metric_card("Prosecution Risk", pros_risk, f"{prosecution_strength}%",
+                    {"High": "#ef4444", "Medium": "#f59e0b", "Low": "#10b981"}[pros_risk])
+    with col2:
+        metric_card("Defense Strength", def_strength_level, f"{defense_strength}%",
+                    {"High": "#10b981", "Medium": "#f59e0b", "Low": "#ef4444"}[def_strength_level])
+
+@st.fragment
+def evidence_chart():
+    """Evidence distribution pie chart with its sliders"""
+    import plotly.express as px
+    
+    evidence_data = {
+        name: st.slider(label, 0, 100, default, key=key, help=f"{label} percentage")
+        for key, label, name, default in EVIDENCE_SLIDERS
+    }
+    fig = px.pie(
+        values=list(evidence_data.values()),
+        names=list(evidence_data.keys()),
+        title="Evidence Distribution",
+        color_discrete_sequence=px.colors.sequential.Purples,
+        hole=0.3
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    fig.update_layout(**CHART_LAYOUT)
+    st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment
+def timeline_chart():
+    """Case progress timeline with its stage checkboxes"""
+    import pandas as pd
+    import plotly.graph_objects as go
+    
+    st.markdown("### 📅 Case Progress Timeline")
+    st.markdown("**📋 Select Completed Stages:**")
+    columns = st.columns(3)
+    done = [columns[index % 3].checkbox(label, value=default, key=key)
+            for index, (key, label, _, default) in enumerate(CASE_STAGES)]
+    timeline_data = pd.DataFrame({
+        'Stage': [name for _, _, name, _ in CASE_STAGES],
+        'Status': ['Complete' if stage_done else 'Pending' for stage_done in done],
+        'Progress': [100 if stage_done else 0 for stage_done in done],
+    })
+    
+    fig = go.Figure(data=[
+        go.Bar(
+            x=timeline_data['Stage'],
+            y=timeline_data['Progress'],
+            marker_color=['#10b981' if x == 100 else '#9ca3af' for x in timeline_data['Progress']],
+            text=[f"{x}%" for x in timeline_data['Progress']],
+            textposition='auto',
+        )
+    ])
+    fig.update_layout(title="Case Progress by Stage", yaxis_title="Completion (%)", **CHART_LAYOUT)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    completed_stages = sum(done)
+    complexity = level_of(completed_stages, 4, 2)
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        metric_card("Case Complexity", complexity, f"{completed_stages}/6 Stages",
+                    {"High": "#ef4444", "Medium": "#f59e0b", "Low": "#10b981"}[complexity])
+    with col2:
+        st.dataframe(timeline_data, use_container_width=True, hide_index=True)
+
+@st.fragment
+def visual_summary(case_id):
+    """Summary across all charts, read from their widget state"""
+    st.markdown("### 📝 Analysis Summary")
+    state = st.session_state
+    prosecution_strength = state.get('pros_strength', STRENGTH_DEFAULTS['pros_strength'])
+    defense_strength = state.get('def_strength', STRENGTH_DEFAULTS['def_strength'])
+    completed_stages = sum(state.get(key, default) for key, _, _, default in CASE_STAGES)
+    evidence_data = {name: state.get(key, default) for key, _, name, default in EVIDENCE_SLIDERS}
+    st.markdown(f"""
+    <div class="analysis-box">
+        <p><strong>Case ID:</strong> {case_id}</p>
+        <p><strong>Completed Stages:</strong> {completed_stages} out of 6</p>
+        <p><strong>Prosecution Advantage:</strong> {prosecution_strength - defense_strength:+d}%</p>
+        <p><strong>Total Evidence:</strong> {sum(evidence_data.values())}%</p>
+        <p><strong>Strongest Evidence:</strong> {max(evidence_data, key=evidence_data.get)} ({max(evidence_data.values())}%)</p>
+    </div>
+    """, unsafe_allow_html=True)
+    # Charts rerun on their own, so the summary catches up on request
+    st.button("🔄 Refresh Summary")
 
 def main():
+    open_case_from_query_params()
+    
     # Custom Header
     st.markdown("""
     <div class="custom-header">
@@ -962,13 +1090,25 @@ def main():
                 st.rerun()
         
         api_key = st.session_state.api_key
+        # Counting keys rather than building the pool keeps the Gemini SDK out of startup
+        pool_size = len(get_operator_keys())
+        has_model_access = bool(api_key) or pool_size > 0
+        if not api_key and pool_size:
+            st.info(f"🔐 Using the shared key pool ({pool_size} keys). "
+                    "Save your own key to use your own quota.")
         
         st.markdown("---")
         
         # Language
         st.markdown("## 🌐 Language")
-        language = st.selectbox("Select Language", ['English', 'Hindi', 'Telugu', 'Tamil'], label_visibility="collapsed")
+        language = st.selectbox("Select Language", LANGUAGES, label_visibility="collapsed")
         st.session_state.current_language = language
+        stream_responses = st.toggle("⚡ Stream responses", value=True,
+                                     help="Show the analysis as it is generated")
+        bypass_cache = st.toggle("♻️ Bypass response cache", value=False,
+                                 help="Always request a fresh analysis instead of reusing a cached one")
+        cache_stats = get_response_cache().stats()
+        st.caption(f"Response cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
         
         st.markdown("---")
         
@@ -991,24 +1131,38 @@ def main():
                                          accept_multiple_files=True,
                                          label_visibility="collapsed")
         
-        if uploaded_files and api_key:
-            documents_path = Path("./legal_documents")
+        if uploaded_files and has_model_access:
+            documents_path = LEGAL_DOCUMENTS_DIR
             documents_path.mkdir(exist_ok=True)
             
             for uploaded_file in uploaded_files:
                 file_path = documents_path / uploaded_file.name
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
+                # Skip the write when the file on disk already has the same content
+                data = uploaded_file.getbuffer()
+                digest = hash_bytes(data)
+                if st.session_state.written_uploads.get(uploaded_file.name) == digest:
+                    continue
+                if not (file_path.exists() and file_path.stat().st_size == len(data)
+                        and hash_file(file_path) == digest):
+                    with open(file_path, "wb") as f:
+                        f.write(data)
+                st.session_state.written_uploads[uploaded_file.name] = digest
             
             if st.button("📚 Process", use_container_width=True):
-                with st.spinner("Processing..."):
-                    all_text = ""
-                    for pdf_file in documents_path.glob("*.pdf"):
-                        text = process_pdf(pdf_file)
-                        all_text += text
-                    st.session_state.legal_context = all_text[:20000]
-                    st.session_state.documents_processed = True
-                    st.success("✅ Done!")
+                # The index is shared by every session: this starts a rebuild if the
+                # folder changed, or follows the one another session already started
+                corpus = get_legal_corpus()
+                corpus.refresh(force=True)
+                progress = st.progress(0.0, text="Processing...")
+                while not corpus.wait(timeout=0.25):
+                    done, total = corpus.progress
+                    progress.progress(done / total if total else 0.0, text=f"Processing... ({done}/{total})")
+                progress.empty()
+                for name, error in corpus.errors:
+                    st.warning(f"⚠️ {name}: {error}")
+                index_size = len(corpus.index) if corpus.index is not None else 0
+                st.success(f"✅ Done! {index_size} passages indexed "
+                           f"({corpus.cached_count}/{corpus.file_count} from cache)")
         
         st.markdown("---")
         
@@ -1018,22 +1172,29 @@ def main():
         with col1:
             st.markdown(f"""
             <div class="metric-card">
-                <div class="metric-value">{len(st.session_state.case_history)}</div>
+                <div class="metric-value">{get_case_store().count_cases()}</div>
                 <div class="metric-label">Cases</div>
             </div>
             """, unsafe_allow_html=True)
         
         with col2:
-            docs_count = "✓" if st.session_state.documents_processed else "0"
+            # Also notices documents added by other sessions and rebuilds in the background
+            corpus = get_legal_corpus()
+            corpus.refresh()
+            docs_count = corpus.document_count
             st.markdown(f"""
             <div class="metric-card">
                 <div class="metric-value">{docs_count}</div>
                 <div class="metric-label">Docs</div>
             </div>
             """, unsafe_allow_html=True)
+        
+        case_bodies = st.session_state.case_bodies
+        st.caption(f"🧠 Session memory: {session_memory_bytes() / 1024:,.0f} KB "
+                   f"({len(case_bodies)} cases cached, limit {case_bodies.max_bytes / 1024:,.0f} KB)")
     
     # Main Content
-    if not api_key:
+    if not has_model_access:
         st.markdown("""
         <div class="feature-card">
             <h2>👋 Welcome to LegalMitra</h2>
@@ -1059,154 +1220,142 @@ def main():
     
     # Feature: Analyze Case
     if feature == "📝 Analyze Case":
-        # Load case by ID
-        col1, col2 = st.columns([3, 1])
-        with col1:
-            case_id_input = st.text_input("🔗 Load Case by ID", 
-                                          placeholder="e.g., CASE-000001")
-        with col2:
-            st.markdown("<br>", unsafe_allow_html=True)
-            if st.button("📂 Load", use_container_width=True):
-                if case_id_input:
-                    loaded_case = load_case_by_id(case_id_input)
-                    if loaded_case:
-                        st.markdown(f"""
-                        <div class="feature-card">
-                            <h3>✅ Case Loaded: {case_id_input}</h3>
-                            <p><strong>Date:</strong> {loaded_case['timestamp']}</p>
-                            <p><strong>Language:</strong> {loaded_case['language']}</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        st.markdown("""<div class="analysis-box">""", unsafe_allow_html=True)
-                        st.markdown(f"**Scenario:** {loaded_case['full_scenario']}")
-                        st.markdown("---")
-                        st.markdown(loaded_case['analysis'])
-                        st.markdown("""</div>""", unsafe_allow_html=True)
-                        
-                        if loaded_case['evidence_updates']:
-                            st.markdown("### 🔎 Evidence History")
-                            for idx, update in enumerate(loaded_case['evidence_updates'], 1):
-                                with st.expander(f"Update #{idx} - {update['timestamp']}"):
-                                    st.markdown(f"**Evidence:** {update['evidence']}")
-                                    st.markdown(f"**Impact:** {update['impact_analysis']}")
-                    else:
-                        st.error("❌ Case not found!")
+        load_case_panel()
         
         st.markdown("---")
         
-        # New Case Analysis
-        st.markdown("### 📝 New Case Analysis")
-        case_scenario = st.text_area("Enter case details:", 
-                                     height=200,
-                                     placeholder="Describe the case with all relevant facts, dates, parties, and circumstances...")
-        
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            if st.button("🔍 Analyze", type="primary", use_container_width=True):
-                if case_scenario:
-                    with st.spinner("🤖 AI is analyzing..."):
-                        analysis, case_id = analyze_case(api_key, case_scenario,
-                                                        st.session_state.legal_context,
-                                                        language)
-                        st.session_state.analysis_result = analysis
-                        st.session_state.current_case_id = case_id
-                        st.rerun()
-        
-        with col2:
-            if st.button("📖 Precedents", use_container_width=True):
-                if case_scenario:
-                    with st.spinner("Searching..."):
-                        precedents = search_precedents(api_key, case_scenario)
-                        st.markdown("""<div class="analysis-box">""", unsafe_allow_html=True)
-                        st.markdown("### 📚 Similar Precedents")
-                        st.markdown(precedents)
-                        st.markdown("""</div>""", unsafe_allow_html=True)
-        
-        with col3:
-            if st.session_state.analysis_result:
-                if st.button("📊 Visualize", use_container_width=True):
-                    st.session_state['navigate_to_visual'] = True
-                    st.info("👉 Please go to '📊 Visual Reports' section in the sidebar to view charts!")
+        new_case_form(api_key, language, stream_responses, bypass_cache)
         
         # Display Analysis
-        if st.session_state.analysis_result:
+        current_case = get_current_case()
+        if current_case:
             st.markdown("---")
             
-            if hasattr(st.session_state, 'current_case_id'):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.success(f"🔗 **Case ID:** {st.session_state.current_case_id}")
-                with col2:
-                    case_version = st.session_state.saved_cases_db.get(st.session_state.current_case_id, {}).get('version', 1)
-                    permalink = get_case_permalink(st.session_state.current_case_id, case_version)
-                    st.info(f"**Permalink:** `{permalink}`")
+            shown_version = viewed_version(current_case)
+            col1, col2 = st.columns(2)
+            with col1:
+                st.success(f"🔗 **Case ID:** {current_case['case_id']} (v{shown_version})")
+            with col2:
+                permalink = get_case_permalink(current_case['case_id'], shown_version)
+                st.info(f"**Permalink:** `{permalink}`")
             
-            st.markdown("""<div class="analysis-box">""", unsafe_allow_html=True)
-            st.markdown(st.session_state.analysis_result)
-            st.markdown("""</div>""", unsafe_allow_html=True)
+            if shown_version < current_case['version']:
+                st.info(f"📌 This link shows version {shown_version}; the case is now at version "
+                        f"{current_case['version']}.")
+                if st.button("⏩ Show latest version"):
+                    set_case_query_params(current_case['case_id'], current_case['version'])
+                    st.rerun()
             
-            # Evidence Addition
-            st.markdown("---")
-            st.markdown("### 🔎 Add Evidence/Document")
+            st.markdown(f"""<div class="analysis-box">{render_case_html(current_case['case_id'], shown_version)}</div>""",
+                        unsafe_allow_html=True)
             
-            new_evidence = st.text_area("Enter new evidence or witness statement:",
-                                       height=150,
-                                       placeholder="Example: New CCTV footage shows...")
+            if st.session_state.precedents_result:
+                st.markdown("""<div class="analysis-box">""", unsafe_allow_html=True)
+                st.markdown("### 📚 Similar Precedents")
+                st.markdown(st.session_state.precedents_result)
+                st.markdown("""</div>""", unsafe_allow_html=True)
             
-            if st.button("🔄 Update Analysis", type="secondary"):
-                if new_evidence and hasattr(st.session_state, 'current_case_id'):
-                    with st.spinner("🤖 Analyzing evidence..."):
-                        update = update_with_evidence(api_key,
-                                                     st.session_state.current_case_id,
-                                                     st.session_state.analysis_result,
-                                                     new_evidence,
-                                                     language)
-                        
-                        st.success("✅ Evidence analyzed!")
-                        st.markdown("""<div class="analysis-box">""", unsafe_allow_html=True)
-                        st.markdown("### 🔄 Impact Analysis")
-                        st.markdown(update)
-                        st.markdown("""</div>""", unsafe_allow_html=True)
-                        
-                        st.info("💡 Add more evidence by entering new details above!")
+            evidence_panel(api_key, language, stream_responses)
     
     # Feature: Case History
     elif feature == "📚 Case History":
         st.markdown("## 📚 Case History")
         
-        if st.session_state.case_history:
-            st.markdown(f"**Total Cases:** {len(st.session_state.case_history)}")
+        total_cases = get_case_store().count_cases()
+        if total_cases:
+            col1, col2, col3 = st.columns([3, 1, 2])
+            with col1:
+                search_query = st.text_input("🔎 Search cases",
+                                             placeholder="e.g., Section 420 cheating")
+            with col2:
+                language_filter = st.selectbox("🌐 Language", ['All'] + LANGUAGES)
+            with col3:
+                date_range = st.date_input("📅 Created between", value=())
             
-            for case in reversed(st.session_state.case_history):
-                case_version = case.get('version', 1)
-                permalink = get_case_permalink(case['case_id'], case_version)
-                last_updated = case.get('last_updated', case['timestamp'])
-                
-                st.markdown(f"""
-                <div class="case-card">
-                    <h3>{case['case_id']} <span style="color: #667eea;">v{case_version}</span></h3>
-                    <p><strong>📅 Created:</strong> {case['timestamp']}</p>
-                    <p><strong>🔄 Last Updated:</strong> {last_updated}</p>
-                    <p><strong>🌐 Language:</strong> {case['language']}</p>
-                    <p><strong>🔗 Permalink:</strong> <code>{permalink}</code></p>
-                    <p><strong>📋 Scenario:</strong> {case['case_scenario'][:150]}...</p>
-                    {f'<p><strong>🔎 Evidence Updates:</strong> {len(case["evidence_updates"])}</p>' if case['evidence_updates'] else ''}
-                </div>
-                """, unsafe_allow_html=True)
+            filters = {
+                'language': None if language_filter == 'All' else language_filter,
+                'date_from': date_range[0] if len(date_range) > 0 else None,
+                'date_to': date_range[1] if len(date_range) > 1 else None,
+            }
+            
+            page_size = st.selectbox("Cases per page", HISTORY_PAGE_SIZES, index=1)
+            
+            # Changing the query or filters starts again from the first page
+            filter_key = (search_query, language_filter, tuple(date_range), page_size)
+            if st.session_state.get('history_filter_key') != filter_key:
+                st.session_state.history_filter_key = filter_key
+                st.session_state.history_page = 0
+                # Whether the search matched more cases than it ranks; looked up once per query
+                st.session_state.history_search_capped = None
+                # Listing pages are fetched by key: history_cursors[n] is where page n starts
+                st.session_state.history_cursors = [None]
+            page = st.session_state.history_page
+            offset = page * page_size
+            
+            if search_query.strip():
+                started = time.perf_counter()
+                # One extra row tells us whether there is a next page
+                results = get_case_store().search(search_query, limit=page_size + 1,
+                                                  offset=offset, **filters)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                has_next = len(results) > page_size
+                results = results[:page_size]
+                st.markdown(f"**Matching cases - page {page + 1}** ({elapsed_ms:.0f} ms)")
+                if not results:
+                    st.info("🔍 No cases match your search.")
+                if st.session_state.history_search_capped is None:
+                    st.session_state.history_search_capped = get_case_store().search_capped(search_query, **filters)
+                if st.session_state.history_search_capped:
+                    st.info(f"🔍 More than {SEARCH_CANDIDATES} cases match, so only the newest {SEARCH_CANDIDATES} "
+                            f"are shown. Add words, a language or a date range to narrow the search.")
+                for case in results:
+                    render_case_card(case, snippet=case['snippet'])
+            else:
+                matching_cases = get_case_store().count_cases(**filters)
+                total_pages = max(1, -(-matching_cases // page_size))
+                has_next = page + 1 < total_pages
+                st.markdown(f"**Total Cases:** {matching_cases} · page {page + 1} of {total_pages}")
                 
-                with st.expander("📖 View Details"):
-                    st.markdown("### Analysis:")
-                    st.markdown(case['analysis'])
-                    
-                    if case['evidence_updates']:
-                        st.markdown("### Evidence Updates:")
-                        for idx, update in enumerate(case['evidence_updates'], 1):
-                            st.markdown(f"**Update #{idx}** - {update['timestamp']}")
-                            st.markdown(f"*Evidence:* {update['evidence']}")
-                            st.markdown(f"*Impact:* {update['impact_analysis']}")
-                            st.markdown("---")
+                cases = get_case_store().list_cases(limit=page_size,
+                                                    after=st.session_state.history_cursors[page], **filters)
+                if has_next and cases:
+                    del st.session_state.history_cursors[page + 1:]
+                    st.session_state.history_cursors.append(get_case_store().page_key(cases[-1]))
+                for case in cases:
+                    render_case_card(case)
+            
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                st.button("⬅️ Previous", use_container_width=True, disabled=page == 0,
+                          on_click=lambda: st.session_state.update(history_page=page - 1))
+            with col3:
+                st.button("Next ➡️", use_container_width=True, disabled=not has_next,
+                          on_click=lambda: st.session_state.update(history_page=page + 1))
+            
+            # Bulk export of everything matching the current search and filters
+            st.markdown("---")
+            st.markdown("### 📦 Bulk Export")
+            col1, col2 = st.columns([1, 2])
+            with col1:
+                bulk_format = st.selectbox("Format", list(EXPORT_FORMATS),
+                                           format_func=lambda f: "Word (.docx)" if f == 'docx' else "PDF")
+            with col2:
+                st.write("")
+                export_all = st.button(f"📦 Export matching cases as ZIP (up to {BULK_EXPORT_MAX_CASES})",
+                                       use_container_width=True)
+            if search_query.strip() and st.session_state.history_search_capped:
+                st.caption(f"⚠️ The ZIP is drawn from the newest {SEARCH_CANDIDATES} matching cases only.")
+            if export_all:
+                store = get_case_store()
+                if search_query.strip():
+                    matches = store.search(search_query, limit=BULK_EXPORT_MAX_CASES, **filters)
+                else:
+                    matches = store.list_cases(limit=BULK_EXPORT_MAX_CASES, **filters)
+                case_ids = [case['case_id'] for case in matches]
+                start_export('bulk', build_zip, case_ids,
+                             partial(export_case_file, store, get_export_cache(), bulk_format))
+            show_export_job('bulk', "⬇️ Download ZIP", f"LegalMitra_Cases_{datetime.now().strftime('%Y%m%d_%H%M')}.zip",
+                            "application/zip", "✅ ZIP ready for download!")
         else:
             st.info("📝 No cases yet. Start by analyzing a case!")
     
@@ -1219,205 +1368,43 @@ def main():
         
         if st.button("🔎 Search Database", type="primary"):
             if search_query:
-                with st.spinner("🔍 Searching Indian case law..."):
-                    results = search_precedents(api_key, search_query)
-                    st.markdown("""<div class="analysis-box">""", unsafe_allow_html=True)
-                    st.markdown("### 📚 Relevant Precedents")
+                st.markdown("""<div class="analysis-box">""", unsafe_allow_html=True)
+                st.markdown("### 📚 Relevant Precedents")
+                if stream_responses:
+                    results = search_precedents(api_key, search_query, placeholder=st.empty())
+                    if results.startswith("Error:"):
+                        st.error(f"❌ {results}")
+                else:
+                    with st.spinner("🔍 Searching Indian case law..."):
+                        results = search_precedents(api_key, search_query)
                     st.markdown(results)
-                    st.markdown("""</div>""", unsafe_allow_html=True)
+                st.markdown("""</div>""", unsafe_allow_html=True)
     
     # Feature: Visual Reports
     elif feature == "📊 Visual Reports":
         st.markdown("## 📊 Visual Analytics")
         
-        if st.session_state.analysis_result and hasattr(st.session_state, 'current_case_id'):
+        if st.session_state.current_case_id:
             # Get case data
             case_id = st.session_state.current_case_id
-            case_data = st.session_state.saved_cases_db.get(case_id)
+            case_data = load_case_by_id(case_id)
             
             if case_data:
                 st.success(f"📊 Analyzing Case: {case_id}")
+                st.caption("Each chart updates on its own as you change its settings.")
                 
-                # User Input Section for Case Progress
-                st.markdown("### ⚙️ Configure Case Progress")
-                
+                st.markdown("### 🎯 Case Strength Assessment")
                 col1, col2 = st.columns(2)
-                
                 with col1:
-                    st.markdown("**📋 Select Completed Stages:**")
-                    incident_done = st.checkbox("Incident Occurred", value=True, key="incident")
-                    fir_done = st.checkbox("FIR Filed", value=True, key="fir")
-                    investigation_done = st.checkbox("Investigation", value=False, key="investigation")
-                    arrest_done = st.checkbox("Arrest Made", value=False, key="arrest")
-                    chargesheet_done = st.checkbox("Charge Sheet Filed", value=False, key="chargesheet")
-                    trial_done = st.checkbox("Trial Commenced", value=False, key="trial")
-                
+                    strength_chart()
                 with col2:
-                    st.markdown("**⚖️ Case Assessment:**")
-                    prosecution_strength = st.slider("Prosecution Strength", 0, 100, 70, key="pros_strength", help="Set prosecution strength percentage")
-                    defense_strength = st.slider("Defense Strength", 0, 100, 30, key="def_strength", help="Set defense strength percentage")
-                    
-                    st.markdown("**📂 Evidence Distribution:**")
-                    doc_evidence = st.slider("Documentary Evidence", 0, 100, 40, key="doc_ev", help="Documentary evidence percentage")
-                    witness_evidence = st.slider("Witness Testimony", 0, 100, 30, key="wit_ev", help="Witness testimony percentage")
-                    physical_evidence = st.slider("Physical Evidence", 0, 100, 20, key="phy_ev", help="Physical evidence percentage")
-                    digital_evidence = st.slider("Digital Evidence", 0, 100, 10, key="dig_ev", help="Digital evidence percentage")
+                    evidence_chart()
                 
-                if st.button("🔄 Generate Visual Reports", type="primary", use_container_width=True):
-                    # Create timeline data based on user input
-                    timeline_data = pd.DataFrame({
-                        'Stage': ['Incident', 'FIR Filed', 'Investigation', 'Arrest', 'Charge Sheet', 'Trial'],
-                        'Status': [
-                            'Complete' if incident_done else 'Pending',
-                            'Complete' if fir_done else 'Pending',
-                            'Complete' if investigation_done else 'Pending',
-                            'Complete' if arrest_done else 'Pending',
-                            'Complete' if chargesheet_done else 'Pending',
-                            'Complete' if trial_done else 'Pending'
-                        ],
-                        'Progress': [
-                            100 if incident_done else 0,
-                            100 if fir_done else 0,
-                            100 if investigation_done else 0,
-                            100 if arrest_done else 0,
-                            100 if chargesheet_done else 0,
-                            100 if trial_done else 0
-                        ]
-                    })
-                    
-                    risk_data = {
-                        'Prosecution Strength': prosecution_strength,
-                        'Defense Strength': defense_strength
-                    }
-                    
-                    evidence_data = {
-                        'Documentary': doc_evidence,
-                        'Witness Testimony': witness_evidence,
-                        'Physical Evidence': physical_evidence,
-                        'Digital Evidence': digital_evidence
-                    }
-                    
-                    st.markdown("---")
-                    
-                    # Case Strength Assessment
-                    st.markdown("### 🎯 Case Strength Assessment")
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        fig1 = go.Figure(data=[
-                            go.Bar(
-                                x=list(risk_data.keys()),
-                                y=list(risk_data.values()),
-                                marker_color=['#ef4444', '#22c55e'],
-                                text=[f"{v}%" for v in risk_data.values()],
-                                textposition='auto',
-                            )
-                        ])
-                        fig1.update_layout(
-                            title="Prosecution vs Defense Strength",
-                            yaxis_title="Strength (%)",
-                            plot_bgcolor='rgba(0,0,0,0)',
-                            paper_bgcolor='rgba(0,0,0,0)',
-                            font=dict(color='#1f2937'),
-                            height=400
-                        )
-                        st.plotly_chart(fig1, use_container_width=True)
-                    
-                    with col2:
-                        fig2 = px.pie(
-                            values=list(evidence_data.values()),
-                            names=list(evidence_data.keys()),
-                            title="Evidence Distribution",
-                            color_discrete_sequence=px.colors.sequential.Purples,
-                            hole=0.3
-                        )
-                        fig2.update_traces(textposition='inside', textinfo='percent+label')
-                        fig2.update_layout(
-                            plot_bgcolor='rgba(0,0,0,0)',
-                            paper_bgcolor='rgba(0,0,0,0)',
-                            font=dict(color='#1f2937'),
-                            height=400
-                        )
-                        st.plotly_chart(fig2, use_container_width=True)
-                    
-                    # Case Timeline
-                    st.markdown("### 📅 Case Progress Timeline")
-                    fig3 = go.Figure(data=[
-                        go.Bar(
-                            x=timeline_data['Stage'],
-                            y=timeline_data['Progress'],
-                            marker_color=['#10b981' if x == 100 else '#9ca3af' for x in timeline_data['Progress']],
-                            text=[f"{x}%" for x in timeline_data['Progress']],
-                            textposition='auto',
-                        )
-                    ])
-                    fig3.update_layout(
-                        title="Case Progress by Stage",
-                        yaxis_title="Completion (%)",
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        font=dict(color='#1f2937'),
-                        height=400
-                    )
-                    st.plotly_chart(fig3, use_container_width=True)
-                    
-                    # Risk Assessment Gauge
-                    st.markdown("### ⚠️ Overall Risk Assessment")
-                    col1, col2, col3 = st.columns(3)
-                    
-                    # Calculate risk levels
-                    pros_risk = "High" if prosecution_strength > 60 else "Medium" if prosecution_strength > 30 else "Low"
-                    pros_color = "#ef4444" if pros_risk == "High" else "#f59e0b" if pros_risk == "Medium" else "#10b981"
-                    
-                    def_strength_level = "High" if defense_strength > 60 else "Medium" if defense_strength > 30 else "Low"
-                    def_color = "#10b981" if def_strength_level == "High" else "#f59e0b" if def_strength_level == "Medium" else "#ef4444"
-                    
-                    completed_stages = sum([incident_done, fir_done, investigation_done, arrest_done, chargesheet_done, trial_done])
-                    complexity = "High" if completed_stages > 4 else "Medium" if completed_stages > 2 else "Low"
-                    complex_color = "#ef4444" if complexity == "High" else "#f59e0b" if complexity == "Medium" else "#10b981"
-                    
-                    with col1:
-                        st.markdown(f"""
-                        <div class="metric-card" style="background: linear-gradient(135deg, {pros_color} 0%, {pros_color} 100%);">
-                            <div class="metric-label">Prosecution Risk</div>
-                            <div class="metric-value">{pros_risk}</div>
-                            <div class="metric-label">{prosecution_strength}%</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col2:
-                        st.markdown(f"""
-                        <div class="metric-card" style="background: linear-gradient(135deg, {complex_color} 0%, {complex_color} 100%);">
-                            <div class="metric-label">Case Complexity</div>
-                            <div class="metric-value">{complexity}</div>
-                            <div class="metric-label">{completed_stages}/6 Stages</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col3:
-                        st.markdown(f"""
-                        <div class="metric-card" style="background: linear-gradient(135deg, {def_color} 0%, {def_color} 100%);">
-                            <div class="metric-label">Defense Strength</div>
-                            <div class="metric-value">{def_strength_level}</div>
-                            <div class="metric-label">{defense_strength}%</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    # Data Table
-                    st.markdown("### 📊 Case Progress Details")
-                    st.dataframe(timeline_data, use_container_width=True, hide_index=True)
-                    
-                    # Summary
-                    st.markdown("### 📝 Analysis Summary")
-                    st.markdown(f"""
-                    <div class="analysis-box">
-                        <p><strong>Case ID:</strong> {case_id}</p>
-                        <p><strong>Completed Stages:</strong> {completed_stages} out of 6</p>
-                        <p><strong>Prosecution Advantage:</strong> {prosecution_strength - defense_strength:+d}%</p>
-                        <p><strong>Total Evidence:</strong> {doc_evidence + witness_evidence + physical_evidence + digital_evidence}%</p>
-                        <p><strong>Strongest Evidence:</strong> {max(evidence_data, key=evidence_data.get)} ({max(evidence_data.values())}%)</p>
-                    </div>
-                    """, unsafe_allow_html=True)
+                st.markdown("---")
+                timeline_chart()
+                
+                st.markdown("---")
+                visual_summary(case_id)
             else:
                 st.error("❌ Case data not found!")
         else:
@@ -1429,8 +1416,7 @@ def main():
                     <li>Go to "Analyze Case" and analyze a case</li>
                     <li>Come back to "Visual Reports"</li>
                     <li>Configure the case progress stages and percentages</li>
-                    <li>Click "Generate Visual Reports"</li>
-                    <li>View interactive charts and analysis</li>
+                    <li>Each chart updates as you change its settings</li>
                 </ol>
             </div>
             """, unsafe_allow_html=True)
@@ -1449,12 +1435,12 @@ def main():
         </div>
         """, unsafe_allow_html=True)
         
-        if st.session_state.analysis_result and hasattr(st.session_state, 'current_case_id'):
+        if st.session_state.current_case_id:
             st.success("✅ Analysis available for export!")
             
             # Get case data
             case_id = st.session_state.current_case_id
-            case_data = st.session_state.saved_cases_db.get(case_id)
+            case_data = load_case_by_id(case_id)
             
             if case_data:
                 case_scenario = case_data['full_scenario']
@@ -1517,19 +1503,12 @@ def main():
                     </div>
                     """, unsafe_allow_html=True)
                     
+                    word_job = (case_id, case_data['version'], 'docx')
                     if st.button("📝 Generate Word Document", use_container_width=True, type="primary"):
-                        with st.spinner("📝 Generating Word document..."):
-                            word_buffer = export_to_word(case_scenario, analysis, case_id)
-                            
-                            if word_buffer:
-                                st.download_button(
-                                    label="⬇️ Download Word Report (.docx)",
-                                    data=word_buffer,
-                                    file_name=f"LegalMitra_Analysis_{case_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx",
-                                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                                    use_container_width=True
-                                )
-                                st.success("✅ Word document ready! All Telugu/Hindi text will display perfectly!")
+                        start_export(word_job, get_case_export, case_data, 'docx', get_export_cache())
+                    show_export_job(word_job, "⬇️ Download Word Report (.docx)",
+                                    export_file_name(case_data, 'docx'), EXPORT_FORMATS['docx'][0],
+                                    "✅ Word document ready! All Telugu/Hindi text will display perfectly!")
                 
                 with col2:
                     st.markdown("""
@@ -1541,22 +1520,18 @@ def main():
                     </div>
                     """, unsafe_allow_html=True)
                     
+                    pdf_job = (case_id, case_data['version'], 'pdf')
                     if st.button("📄 Generate PDF", use_container_width=True):
-                        if case_language in ['Telugu', 'Hindi', 'Tamil']:
-                            st.warning(f"⚠️ Note: PDF may not display {case_language} characters correctly. Word format is recommended!")
+                        missing_scripts = get_font_registry().missing_scripts(case_scenario + analysis)
+                        if missing_scripts:
+                            st.warning(f"⚠️ Note: the server cannot render {', '.join(missing_scripts)} text in PDFs "
+                                       "(a Noto font for the script, a Latin TrueType font such as Noto Sans and "
+                                       "the uharfbuzz package are needed), so those characters may not display "
+                                       "correctly. Word format is recommended!")
                         
-                        with st.spinner("📄 Generating PDF..."):
-                            pdf_buffer = export_to_pdf(case_scenario, analysis, case_id)
-                            
-                            if pdf_buffer:
-                                st.download_button(
-                                    label="⬇️ Download PDF Report",
-                                    data=pdf_buffer,
-                                    file_name=f"LegalMitra_Analysis_{case_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                                    mime="application/pdf",
-                                    use_container_width=True
-                                )
-                                st.success("✅ PDF ready for download!")
+                        start_export(pdf_job, get_case_export, case_data, 'pdf', get_export_cache())
+                    show_export_job(pdf_job, "⬇️ Download PDF Report", export_file_name(case_data, 'pdf'),
+                                    EXPORT_FORMATS['pdf'][0], "✅ PDF ready for download!")
                 
                 # Export options comparison
                 st.markdown("---")
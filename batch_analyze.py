@@ -0,0 +1,196 @@
+"""Headless batch analysis of case scenarios from a JSONL file
+
+Each input line is a JSON object with a "scenario" (or "case_scenario") and
+optionally an "id" and a "language" (English, Hindi, Telugu or Tamil).
+Results are appended to the output JSONL as they finish and every successful
+analysis is saved to the case store, so an interrupted run can simply be
+restarted: ids that already have a case_id in the output file are skipped.
+
+    python batch_analyze.py firs.jsonl -o results.jsonl --concurrency 4
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+from case_store import CaseStore
+from gemini_client import GeminiClient, KeyPool, parse_api_keys
+from ingest import get_extract_cache, process_documents
+from prompts import LANGUAGES, build_analysis_prompt
+from response_cache import ResponseCache, make_cache_key
+from retrieval import build_index, retrieve_context
+from state_backend import open_state_backend
+from token_budget import fit_context
+
+
+def read_scenarios(path):
+    """Yield (id, scenario, language) from a JSONL file, skipping blank lines
+
+    Raises ValueError for a line without a scenario or with a language the
+    app does not offer.
+    """
+    with open(path, encoding='utf-8') as file:
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            scenario = record.get('scenario') or record.get('case_scenario')
+            if not scenario:
+                raise ValueError(f"{path}:{line_number}: missing 'scenario'")
+            language = record.get('language', 'English')
+            if language not in LANGUAGES:
+                raise ValueError(f"{path}:{line_number}: unknown language {language!r}; "
+                                 f"expected one of {', '.join(LANGUAGES)}")
+            yield str(record.get('id', line_number)), scenario, language
+
+
+def read_checkpoint(output_path):
+    """Return the ids that already have a stored case in the output file"""
+    done = set()
+    if not output_path.exists():
+        return done
+    with open(output_path, encoding='utf-8') as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by an interruption; that id will be retried
+                continue
+            if record.get('case_id'):
+                done.add(record['id'])
+    return done
+
+
+def load_legal_index(documents_path):
+    """Build the retrieval index over a folder of PDFs, or None"""
+    if not documents_path:
+        return None
+    pdf_files = sorted(Path(documents_path).glob("*.pdf"))
+    results = process_documents(pdf_files, cache=get_extract_cache())
+    for result in results:
+        if result['error']:
+            print(f"warning: {result['path'].name}: {result['error']}", file=sys.stderr)
+    return build_index((result['path'].name, result['text']) for result in results if result['text'])
+
+
+class BatchRunner:
+    """Runs analyses with the app's prompt, cache and case store, without Streamlit"""
+
+    def __init__(self, client, store, response_cache, legal_index=None, use_cache=True):
+        self.client = client
+        self.store = store
+        self.response_cache = response_cache
+        self.legal_index = legal_index
+        self.use_cache = use_cache
+
+    def analyze(self, record_id, case_scenario, language):
+        """Analyze one scenario and return its output record"""
+        prompt, legal_context, _ = fit_context(
+            lambda context: build_analysis_prompt(case_scenario, context, language),
+            retrieve_context(self.legal_index, case_scenario), 'analysis')
+        cache_key = make_cache_key(case_scenario, legal_context, language, self.client.model_name)
+        analysis = self.response_cache.get(cache_key) if self.use_cache else None
+        cached = analysis is not None
+        usage = {'input_tokens': 0, 'output_tokens': 0}
+        if not cached:
+            analysis = self.client.generate(prompt, usage=usage)
+            self.response_cache.set(cache_key, analysis)
+        case_data = self.store.create_case(case_scenario, analysis, language, **usage)
+        return {
+            'id': record_id,
+            'case_id': case_data['case_id'],
+            'language': language,
+            'cached': cached,
+            **usage,
+            'analysis': analysis,
+            'timestamp': case_data['timestamp'],
+        }
+
+    def run(self, scenarios, output_path, concurrency=4):
+        """Analyze all scenarios not yet in the output file; returns (succeeded, failed)"""
+        done = read_checkpoint(output_path)
+        pending = [item for item in scenarios if item[0] not in done]
+        print(f"{len(done)} already done, {len(pending)} to analyze", file=sys.stderr)
+
+        write_lock = threading.Lock()
+        succeeded = failed = 0
+        with open(output_path, 'a', encoding='utf-8') as output, \
+                ThreadPoolExecutor(max_workers=concurrency) as executor:
+
+            def write(record):
+                with write_lock:
+                    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    output.flush()
+
+            # Keep a bounded number of requests in flight so huge inputs don't pile up futures
+            in_flight = {}
+            items = iter(pending)
+            while True:
+                while len(in_flight) < concurrency * 2:
+                    item = next(items, None)
+                    if item is None:
+                        break
+                    in_flight[executor.submit(self.analyze, *item)] = item
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record_id, _, language = in_flight.pop(future)
+                    try:
+                        record = future.result()
+                        succeeded += 1
+                        print(f"[{succeeded + failed}/{len(pending)}] {record_id} -> {record['case_id']}",
+                              file=sys.stderr)
+                    except Exception as e:
+                        record = {'id': record_id, 'case_id': None, 'language': language,
+                                  'error': str(e), 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+                        failed += 1
+                        print(f"[{succeeded + failed}/{len(pending)}] {record_id} failed: {e}", file=sys.stderr)
+                    write(record)
+        return succeeded, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze case scenarios from a JSONL file without the web UI")
+    parser.add_argument("input", type=Path, help="JSONL file with one scenario per line")
+    parser.add_argument("-o", "--output", type=Path, required=True,
+                        help="JSONL file for results; also used as the resume checkpoint")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once (default: 4)")
+    parser.add_argument("--documents", type=Path, help="Folder of legal PDFs to retrieve context from")
+    parser.add_argument("--api-key", help="Gemini API key (default: $GEMINI_API_KEY or $GOOGLE_API_KEY)")
+    parser.add_argument("--api-keys",
+                        help="Comma-separated keys to balance requests across (default: $GEMINI_API_KEYS)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the response cache lookup")
+    args = parser.parse_args(argv)
+
+    # A key option given on the command line wins over any key in the environment
+    if args.api_key is None and args.api_keys is None:
+        args.api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+        args.api_keys = os.environ.get("GEMINI_API_KEYS", "")
+    pool_keys = parse_api_keys(args.api_keys or "")
+    if args.api_key:
+        client = GeminiClient(args.api_key)
+    elif pool_keys:
+        client = KeyPool(pool_keys)
+    else:
+        parser.error("no API key: pass --api-key/--api-keys or set GEMINI_API_KEY")
+
+    runner = BatchRunner(
+        client=client,
+        store=CaseStore(shared=open_state_backend()),
+        response_cache=ResponseCache(),
+        legal_index=load_legal_index(args.documents),
+        use_cache=not args.no_cache,
+    )
+    succeeded, failed = runner.run(list(read_scenarios(args.input)), args.output,
+                                   concurrency=max(1, args.concurrency))
+    print(f"done: {succeeded} analyzed, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
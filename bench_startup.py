@@ -0,0 +1,110 @@
+"""Cold-start benchmark for app.py
+
+Each run starts a fresh Python process and measures:
+
+- import: time to import everything app.py imports at module level
+- first_render: time for a new session to render the welcome screen,
+  including those imports, run through Streamlit's AppTest harness
+
+It also lists heavy optional dependencies that got loaded on the way, which
+should stay empty. Runs happen in a scratch directory so no real case
+database or cache is touched.
+
+    python bench_startup.py --runs 5 --budget 1.5
+"""
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+APP_PATH = Path(__file__).resolve().parent / "app.py"
+# Modules that should only load when the feature needing them is used
+# (plotly.graph_objects is left out: Streamlit itself imports it)
+HEAVY_MODULES = ["pandas", "plotly.express", "google.generativeai", "reportlab.platypus", "docx", "PyPDF2"]
+
+# Run inside the fresh interpreter; prints one JSON line
+PROBE = """
+import importlib, json, sys, time
+sys.path.insert(0, {app_dir!r})
+modules = {modules!r}
+started = time.perf_counter()
+for name in modules:
+    importlib.import_module(name)
+import_seconds = time.perf_counter() - started
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({app_path!r}, default_timeout=120)
+started = time.perf_counter()
+app.run()
+render_seconds = time.perf_counter() - started
+print(json.dumps({{
+    'import': import_seconds,
+    'first_render': import_seconds + render_seconds,
+    'errors': [str(error.value) for error in app.exception],
+    'heavy_modules': [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def top_level_imports(path):
+    """Module names imported at the top level of a script, in order"""
+    modules = []
+    for node in ast.parse(Path(path).read_text(encoding='utf-8')).body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def measure_once(app_path=APP_PATH):
+    """Measure one cold start in a new interpreter; returns the probe's result dict"""
+    probe = PROBE.format(app_dir=str(app_path.parent), app_path=str(app_path),
+                         modules=top_level_imports(app_path), heavy=HEAVY_MODULES)
+    with tempfile.TemporaryDirectory() as scratch:
+        completed = subprocess.run([sys.executable, "-c", probe], cwd=scratch, capture_output=True,
+                                   text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure app.py cold-start time")
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts to measure (default: 5)")
+    parser.add_argument("--budget", type=float,
+                        help="Fail if the median time to first render exceeds this many seconds")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    results = [measure_once() for _ in range(max(1, args.runs))]
+    summary = {
+        'runs': len(results),
+        'import_median': statistics.median(result['import'] for result in results),
+        'first_render_median': statistics.median(result['first_render'] for result in results),
+        'first_render_max': max(result['first_render'] for result in results),
+        'heavy_modules': sorted({name for result in results for name in result['heavy_modules']}),
+        'errors': sorted({error for result in results for error in result['errors']}),
+    }
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        print(f"runs:                {summary['runs']}")
+        print(f"import (median):     {summary['import_median']:.3f}s")
+        print(f"first render (med):  {summary['first_render_median']:.3f}s")
+        print(f"first render (max):  {summary['first_render_max']:.3f}s")
+        print(f"heavy modules:       {', '.join(summary['heavy_modules']) or 'none'}")
+        for error in summary['errors']:
+            print(f"error: {error}", file=sys.stderr)
+
+    if summary['errors']:
+        return 1
+    if args.budget is not None and summary['first_render_median'] > args.budget:
+        print(f"over budget: {summary['first_render_median']:.3f}s > {args.budget:.3f}s", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Per-session LRU of recently viewed case bodies, bounded in bytes
+
+Sessions only hold a reference to their current case (its ID). Full case
+records (scenario, analysis and evidence updates) are kept here while they
+are recently used; evicted ones are loaded again from the case store, so a
+long-lived session's memory stays under a fixed cap.
+"""
+import os
+from collections import OrderedDict
+
+SESSION_CACHE_MAX_BYTES = int(os.environ.get("LEGALMITRA_SESSION_CACHE_BYTES", 2 * 1024 * 1024))
+
+
+def case_body_size(value):
+    """Approximate memory held by a case record: the UTF-8 size of its text"""
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, dict):
+        return sum(case_body_size(key) + case_body_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(case_body_size(item) for item in value)
+    # Numbers and None
+    return 8
+
+
+class CaseBodyCache:
+    """Least recently used case records, keyed by case ID and checked against the current version"""
+
+    def __init__(self, max_bytes=SESSION_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, case_id, version):
+        """Return the cached record if it is at ``version``, else None"""
+        entry = self._entries.get(case_id)
+        if entry is None or entry[0]['version'] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(case_id)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, case_id, case):
+        """Cache a record, evicting the least recently used ones to stay under max_bytes"""
+        self.discard(case_id)
+        size = case_body_size(case)
+        # A record bigger than the whole cap is served but never kept
+        if size > self.max_bytes:
+            return
+        self._entries[case_id] = (case, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+
+    def discard(self, case_id):
+        entry = self._entries.pop(case_id, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def stats(self):
+        return {'entries': len(self._entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses}
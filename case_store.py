@@ -0,0 +1,408 @@
+"""Persistent SQLite storage for analyzed cases and their evidence updates"""
+import json
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+CASE_DB_PATH = Path(os.environ.get("LEGALMITRA_DB_PATH", "legalmitra_cases.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cases (
+    id INTEGER PRIMARY KEY,
+    case_id TEXT NOT NULL UNIQUE,
+    timestamp TEXT NOT NULL,
+    case_scenario TEXT NOT NULL,
+    analysis TEXT NOT NULL,
+    language TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    last_updated TEXT NOT NULL,
+    case_summary TEXT,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0
+);
+-- Match the (timestamp, case_id) order that list_cases pages through
+DROP INDEX IF EXISTS idx_cases_timestamp;
+DROP INDEX IF EXISTS idx_cases_language_timestamp;
+CREATE INDEX IF NOT EXISTS idx_cases_recent ON cases (timestamp, case_id);
+CREATE INDEX IF NOT EXISTS idx_cases_language_recent ON cases (language, timestamp, case_id);
+
+CREATE TABLE IF NOT EXISTS evidence_updates (
+    update_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    case_id TEXT NOT NULL REFERENCES cases (case_id) ON DELETE CASCADE,
+    timestamp TEXT NOT NULL,
+    evidence TEXT NOT NULL,
+    impact_analysis TEXT NOT NULL,
+    version INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_evidence_case ON evidence_updates (case_id, update_id);
+"""
+
+# Columns added to cases after its first release, for upgrading existing databases
+ADDED_CASE_COLUMNS = {
+    'case_summary': "TEXT",
+    'input_tokens': "INTEGER NOT NULL DEFAULT 0",
+    'output_tokens': "INTEGER NOT NULL DEFAULT 0",
+}
+
+# Full-text index over scenario, analysis and evidence text. FTS rows use the
+# case's integer id as their rowid. Indic vowel signs (Mn/Mc) count as token characters so
+# Devanagari/Telugu/Tamil words are not split apart.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE case_search USING fts5 (
+    scenario, analysis, evidence,
+    tokenize = "unicode61 remove_diacritics 2 categories 'L* N* Co Mc Mn'"
+)
+"""
+# Column weights for bm25(): scenario matches count most
+SEARCH_WEIGHTS = (5.0, 1.0, 2.0)
+# Snippet markers are control characters so they survive HTML escaping
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+SEARCH_TOKEN = re.compile(r"[\w\u0900-\u0DFF]+")
+# bm25() costs about 2 ms per thousand rows it ranks, and words from the analysis template
+# ("section", "evidence") match every case, so only this many of the newest matches are ranked
+SEARCH_CANDIDATES = 2000
+
+# Columns needed to list cases without loading analysis bodies
+SUMMARY_COLUMNS = """
+    c.case_id, c.timestamp, c.language, c.version, c.last_updated, c.input_tokens, c.output_tokens,
+    substr(c.case_scenario, 1, 200) AS case_scenario,
+    (SELECT COUNT(*) FROM evidence_updates e WHERE e.case_id = c.case_id) AS evidence_count
+"""
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+# Crockford base32: no I, L, O or U, so IDs are easy to read out and type
+CASE_ID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_case_id_lock = threading.Lock()
+_last_case_id = [0, 0]
+
+
+def _base32(value, length):
+    return "".join(CASE_ID_ALPHABET[(value >> (5 * shift)) & 31] for shift in reversed(range(length)))
+
+
+def new_case_id():
+    """Allocate a ULID-style CASE-<26 chars> id, unique across replicas and sortable by creation time
+
+    48 bits of millisecond time are followed by 80 random bits. Within one
+    millisecond the random part is incremented instead, so ids from one process
+    stay in creation order. IDs from before this scheme (CASE-000001) sort
+    ahead of all of these.
+    """
+    with _case_id_lock:
+        millis = time.time_ns() // 1_000_000
+        last_millis, last_random = _last_case_id
+        if millis <= last_millis and last_random < (1 << 80) - 1:
+            millis, random_part = last_millis, last_random + 1
+        else:
+            random_part = secrets.randbits(80)
+        _last_case_id[:] = [millis, random_part]
+    return "CASE-" + _base32(millis, 10) + _base32(random_part, 16)
+
+
+class CaseStore:
+    """Case repository shared by all sessions in a server process
+
+    One connection is shared behind a lock; Streamlit runs each session on
+    its own thread, so the connection is opened with check_same_thread=False.
+
+    With a ``shared`` StateBackend, every new case and evidence update is
+    published there too, and cases this replica has not seen (or holds an
+    older version of) are copied in from it on lookup. Listing and search
+    only cover cases this replica has stored or looked up.
+    """
+
+    def __init__(self, path=CASE_DB_PATH, shared=None):
+        self.path = Path(path)
+        self.shared = shared
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SCHEMA)
+            self._ensure_columns()
+            self._ensure_search_index()
+
+    def _ensure_columns(self):
+        """Add columns to databases created before those columns existed"""
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(cases)")}
+        for name, definition in ADDED_CASE_COLUMNS.items():
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE cases ADD COLUMN {name} {definition}")
+
+    def _ensure_search_index(self):
+        """Create the FTS table, backfilling it for databases created before search existed"""
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'case_search'").fetchone()
+        if exists:
+            return
+        self._conn.execute(SEARCH_SCHEMA)
+        self._conn.execute(
+            "INSERT INTO case_search (rowid, scenario, analysis, evidence) "
+            "SELECT c.id, c.case_scenario, c.analysis, "
+            "COALESCE((SELECT group_concat(e.evidence || ' ' || e.impact_analysis, ' ') "
+            "FROM evidence_updates e WHERE e.case_id = c.case_id), '') FROM cases c")
+
+    def create_case(self, case_scenario, analysis, language, input_tokens=0, output_tokens=0):
+        """Store a new analysis and return its case record"""
+        now = _now()
+        case_id = new_case_id()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO cases (case_id, timestamp, case_scenario, analysis, language, version, last_updated, "
+                "input_tokens, output_tokens) VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?)",
+                (case_id, now, case_scenario, analysis, language, now, input_tokens, output_tokens))
+            self._conn.execute(
+                "INSERT INTO case_search (rowid, scenario, analysis, evidence) "
+                "SELECT id, case_scenario, analysis, '' FROM cases WHERE case_id = ?",
+                (case_id,))
+        return self._publish(case_id)
+
+    def get_case(self, case_id):
+        """Return a full case record with its evidence updates, or None"""
+        self._sync_from_shared(case_id)
+        return self._read_case(case_id)
+
+    def _read_case(self, case_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM cases WHERE case_id = ?", (case_id,)).fetchone()
+            if row is None:
+                return None
+            updates = self._conn.execute(
+                "SELECT timestamp, evidence, impact_analysis, version FROM evidence_updates "
+                "WHERE case_id = ? ORDER BY update_id", (case_id,)).fetchall()
+        case = dict(row)
+        del case['id']
+        # Older code reads the scenario through both keys
+        case['full_scenario'] = case['case_scenario']
+        case['evidence_updates'] = [dict(update) for update in updates]
+        return case
+
+    def _local_version(self, case_id):
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM cases WHERE case_id = ?", (case_id,)).fetchone()
+        return row[0] if row else None
+
+    def _publish(self, case_id):
+        """Push a case record to the shared backend; returns the record"""
+        case = self._read_case(case_id)
+        if self.shared is not None and case is not None:
+            record = {key: value for key, value in case.items() if key != 'full_scenario'}
+            # Record first, version second: a replica that sees the new version can always read it
+            self.shared.set(f"case:{case_id}", json.dumps(record, ensure_ascii=False).encode('utf-8'))
+            self.shared.set(f"case-version:{case_id}", str(case['version']).encode('ascii'))
+        return case
+
+    def _sync_from_shared(self, case_id):
+        """Copy a case in from the shared backend if it is missing here or out of date"""
+        if self.shared is None:
+            return
+        shared_version = self.shared.get(f"case-version:{case_id}")
+        if shared_version is None:
+            return
+        local_version = self._local_version(case_id)
+        if local_version is not None and local_version >= int(shared_version):
+            return
+        data = self.shared.get(f"case:{case_id}")
+        if data is not None:
+            self._import_case(json.loads(data))
+
+    def _import_case(self, record):
+        """Insert or replace a case and its evidence updates from a shared record"""
+        columns = ('timestamp', 'case_scenario', 'analysis', 'language', 'version', 'last_updated',
+                   'case_summary', 'input_tokens', 'output_tokens')
+        values = [record.get(column) for column in columns]
+        updates = record.get('evidence_updates', [])
+        evidence_text = " ".join(f"{update['evidence']} {update['impact_analysis']}" for update in updates)
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT id FROM cases WHERE case_id = ?", (record['case_id'],)).fetchone()
+            if row is None:
+                self._conn.execute(
+                    f"INSERT INTO cases (case_id, {', '.join(columns)}) VALUES (?{', ?' * len(columns)})",
+                    [record['case_id'], *values])
+            else:
+                self._conn.execute(
+                    f"UPDATE cases SET {', '.join(column + ' = ?' for column in columns)} WHERE case_id = ?",
+                    [*values, record['case_id']])
+                self._conn.execute("DELETE FROM evidence_updates WHERE case_id = ?", (record['case_id'],))
+                self._conn.execute("DELETE FROM case_search WHERE rowid = ?", (row['id'],))
+            self._conn.executemany(
+                "INSERT INTO evidence_updates (case_id, timestamp, evidence, impact_analysis, version) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(record['case_id'], update['timestamp'], update['evidence'], update['impact_analysis'],
+                  update['version']) for update in updates])
+            self._conn.execute(
+                "INSERT INTO case_search (rowid, scenario, analysis, evidence) "
+                "SELECT id, case_scenario, analysis, ? FROM cases WHERE case_id = ?",
+                (evidence_text, record['case_id']))
+
+    def get_version(self, case_id):
+        """Return the current version of a case, or None"""
+        self._sync_from_shared(case_id)
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM cases WHERE case_id = ?", (case_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_summary(self, case_id):
+        """Return the rolling case summary, or None before the first evidence update"""
+        self._sync_from_shared(case_id)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT case_summary FROM cases WHERE case_id = ?", (case_id,)).fetchone()
+        return row[0] if row else None
+
+    def add_evidence_update(self, case_id, evidence, impact_analysis, case_summary=None,
+                            input_tokens=0, output_tokens=0):
+        """Record an evidence update and bump the case version; returns the new version or None
+
+        ``case_summary`` replaces the case's rolling summary when given; token
+        counts are added to the case's running totals.
+        """
+        now = _now()
+        # Start from the latest version, which may have been written by another replica
+        self._sync_from_shared(case_id)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE cases SET version = version + 1, last_updated = ?, "
+                "case_summary = COALESCE(?, case_summary), "
+                "input_tokens = input_tokens + ?, output_tokens = output_tokens + ? WHERE case_id = ?",
+                (now, case_summary, input_tokens, output_tokens, case_id))
+            if cursor.rowcount == 0:
+                return None
+            version = self._conn.execute(
+                "SELECT version FROM cases WHERE case_id = ?", (case_id,)).fetchone()[0]
+            self._conn.execute(
+                "INSERT INTO evidence_updates (case_id, timestamp, evidence, impact_analysis, version) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (case_id, now, evidence, impact_analysis, version))
+            self._conn.execute(
+                "UPDATE case_search SET evidence = evidence || ' ' || ? "
+                "WHERE rowid = (SELECT id FROM cases WHERE case_id = ?)",
+                (evidence + " " + impact_analysis, case_id))
+        self._publish(case_id)
+        return version
+
+    @staticmethod
+    def _filters(language=None, date_from=None, date_to=None):
+        """Build SQL conditions on cases c; date bounds are inclusive datetime.date values"""
+        conditions = []
+        params = []
+        if language:
+            conditions.append("c.language = ?")
+            params.append(language)
+        if date_from:
+            conditions.append("c.timestamp >= ?")
+            params.append(date_from.strftime('%Y-%m-%d'))
+        if date_to:
+            conditions.append("c.timestamp < ?")
+            params.append((date_to + timedelta(days=1)).strftime('%Y-%m-%d'))
+        return conditions, params
+
+    def list_cases(self, limit=20, after=None, language=None, date_from=None, date_to=None):
+        """Return case summaries, newest first, without analysis bodies
+
+        Pages are fetched by key rather than offset: ``after`` is the
+        page_key() of the last case on the previous page, so every page costs
+        the same however deep into the history it is.
+        """
+        conditions, params = self._filters(language, date_from, date_to)
+        if after is not None:
+            conditions.append("(c.timestamp, c.case_id) < (?, ?)")
+            params.extend(after)
+        query = f"SELECT {SUMMARY_COLUMNS} FROM cases c"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY c.timestamp DESC, c.case_id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def page_key(case):
+        """Position of a listed case, for list_cases(after=...)"""
+        return (case['timestamp'], case['case_id'])
+
+    def count_cases(self, language=None, date_from=None, date_to=None):
+        """Return the number of stored cases"""
+        conditions, params = self._filters(language, date_from, date_to)
+        query = "SELECT COUNT(*) FROM cases c"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()[0]
+
+    def _rank_matches(self, query, language=None, date_from=None, date_to=None):
+        """Rank matching cases; returns (match expression, [case row ids, best first], capped)
+
+        Matches are read from the FTS index newest-first and joined to their
+        case (CROSS JOIN keeps SQLite from starting at the cases indexes and
+        running one MATCH per case), so filters only narrow matches that
+        already exist. The walk stops after SEARCH_CANDIDATES matches, plus
+        one that tells whether older matches were left out.
+        """
+        terms = SEARCH_TOKEN.findall(query)
+        if not terms:
+            return None, [], False
+        quoted = ['"' + term + '"' for term in terms]
+        conditions, params = self._filters(language, date_from, date_to)
+        filters = "".join(" AND " + condition for condition in conditions)
+        weights = ", ".join(str(weight) for weight in SEARCH_WEIGHTS)
+        sql = (
+            f"SELECT case_search.rowid, bm25(case_search, {weights}) "
+            f"FROM case_search CROSS JOIN cases c ON c.id = case_search.rowid WHERE case_search MATCH ?{filters} "
+            f"ORDER BY case_search.rowid DESC LIMIT ?"
+        )
+        with self._lock:
+            match = " AND ".join(quoted)
+            rows = self._conn.execute(sql, [match, *params, SEARCH_CANDIDATES + 1]).fetchall()
+            # Fall back to any-word matching only when no case has all the words
+            if not rows and len(quoted) > 1:
+                match = " OR ".join(quoted)
+                rows = self._conn.execute(sql, [match, *params, SEARCH_CANDIDATES + 1]).fetchall()
+        ranked = sorted(rows[:SEARCH_CANDIDATES], key=lambda row: (row[1], row[0]))
+        return match, [row[0] for row in ranked], len(rows) > SEARCH_CANDIDATES
+
+    def search(self, query, language=None, date_from=None, date_to=None, limit=20, offset=0):
+        """Full-text search over cases, best matches first
+
+        Every query word must match; if no case has them all, any word may
+        match. The choice is made once per query, so every page of results
+        comes from the same match. When more than SEARCH_CANDIDATES cases
+        match, only the newest SEARCH_CANDIDATES of them are ranked; see
+        search_capped(). Each result carries a ``snippet`` whose matches are
+        wrapped in HIGHLIGHT_START/HIGHLIGHT_END. ``date_from``/``date_to``
+        are inclusive ``datetime.date`` bounds on the creation date.
+        """
+        match, ranked, _ = self._rank_matches(query, language, date_from, date_to)
+        page = ranked[offset:offset + limit]
+        if not page:
+            return []
+        sql = (
+            f"SELECT c.id, {SUMMARY_COLUMNS}, "
+            f"snippet(case_search, -1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 16) AS snippet "
+            f"FROM case_search CROSS JOIN cases c ON c.id = case_search.rowid "
+            f"WHERE case_search MATCH ? AND case_search.rowid IN ({', '.join('?' * len(page))})"
+        )
+        with self._lock:
+            rows = {row['id']: dict(row) for row in self._conn.execute(sql, [match, *page])}
+        # A case re-imported from the shared backend since ranking may no longer match
+        results = [rows[row_id] for row_id in page if row_id in rows]
+        for result in results:
+            del result['id']
+        return results
+
+    def search_capped(self, query, language=None, date_from=None, date_to=None):
+        """True when more than SEARCH_CANDIDATES cases match, so search() leaves older ones out"""
+        return self._rank_matches(query, language, date_from, date_to)[2]
@@ -0,0 +1,96 @@
+"""Small size-bounded on-disk cache shared by the LegalMitra helpers"""
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+
+def hash_bytes(data):
+    """Return the hex SHA-256 digest of some bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path, block_size=1024 * 1024):
+    """Return the hex SHA-256 digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """Byte cache stored as one file per key, evicting least recently used entries
+
+    Recency is tracked through file modification times, so the cache survives
+    restarts and can be shared by several processes using the same directory.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key):
+        return self.directory / hash_bytes(key.encode('utf-8'))
+
+    def get(self, key):
+        """Return cached bytes for key, or None"""
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # mark as recently used
+        except OSError:
+            return None
+        return data
+
+    def set(self, key, data):
+        """Store bytes for key and evict old entries if over budget"""
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        # Write to a temp file first so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        self._evict()
+
+    def delete(self, key):
+        """Remove key from the cache if present"""
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.directory.iterdir():
+                if path.suffix == '.tmp':
+                    continue
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                    total -= size
+                except OSError:
+                    pass
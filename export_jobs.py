@@ -0,0 +1,129 @@
+"""Background export jobs so rendering never blocks a Streamlit session"""
+import os
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+# Concurrent export jobs across all sessions
+EXPORT_WORKERS = 2
+# Documents rendered at once inside one bulk export
+BULK_RENDER_WORKERS = 4
+BULK_EXPORT_MAX_CASES = 500
+# Finished jobs nobody collected are forgotten after this long
+JOB_TTL_SECONDS = 30 * 60
+
+
+def _remove_result_file(future):
+    """Delete the file a finished job produced, if its result is a path"""
+    if future.done() and not future.exception() and isinstance(future.result(), Path):
+        try:
+            future.result().unlink()
+        except FileNotFoundError:
+            pass
+
+
+class ExportJobs:
+    """Runs export functions on a shared thread pool; callers poll by job id
+
+    A job may return bytes or, for large results, the Path of a file it
+    wrote; that file is deleted when the job expires or is discarded.
+    """
+
+    def __init__(self, max_workers=EXPORT_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _prune(self):
+        cutoff = time.monotonic() - JOB_TTL_SECONDS
+        for job_id, (future, submitted) in list(self._jobs.items()):
+            if future.done() and submitted < cutoff:
+                del self._jobs[job_id]
+                _remove_result_file(future)
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) and return its job id"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = (self._executor.submit(fn, *args, **kwargs), time.monotonic())
+        return job_id
+
+    def _future(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job[0] if job else None
+
+    def status(self, job_id):
+        """One of 'queued', 'running', 'done', 'failed' or 'missing'"""
+        future = self._future(job_id)
+        if future is None:
+            return 'missing'
+        if future.running():
+            return 'running'
+        if not future.done():
+            return 'queued'
+        return 'failed' if future.exception() else 'done'
+
+    def wait(self, job_id, timeout):
+        """Block up to timeout seconds for a job to finish"""
+        future = self._future(job_id)
+        if future is not None:
+            wait([future], timeout=timeout)
+
+    def result(self, job_id):
+        """Return a finished job's result, raising its exception if it failed"""
+        return self._future(job_id).result()
+
+    def discard(self, job_id):
+        """Forget a job and delete its result file; a running job's file is deleted when it finishes"""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None:
+            job[0].add_done_callback(_remove_result_file)
+
+
+def build_zip(case_ids, render_file, max_workers=BULK_RENDER_WORKERS):
+    """Render cases in parallel into a temporary ZIP file and return its Path
+
+    ``render_file(case_id)`` returns ``(file_name, data)``. Each document is
+    written to the file as soon as it is ready, and only a few renders are
+    in flight at once, so memory stays flat however many cases there are.
+    Failures are listed in errors.txt instead of failing the whole ZIP. The
+    caller owns the file (ExportJobs deletes it when the job expires).
+    """
+    errors = []
+    descriptor, path = tempfile.mkstemp(prefix="legalmitra-export-", suffix=".zip")
+    try:
+        # PDF and DOCX are already compressed, so entries are stored as-is
+        with os.fdopen(descriptor, 'wb') as file, zipfile.ZipFile(file, 'w', zipfile.ZIP_STORED) as archive, \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+            in_flight = {}
+            pending = iter(case_ids)
+            while True:
+                while len(in_flight) < max_workers * 2:
+                    case_id = next(pending, None)
+                    if case_id is None:
+                        break
+                    in_flight[executor.submit(render_file, case_id)] = case_id
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    case_id = in_flight.pop(future)
+                    try:
+                        file_name, data = future.result()
+                    except Exception as e:
+                        errors.append(f"{case_id}: {e}")
+                        continue
+                    archive.writestr(file_name, data)
+            if errors:
+                archive.writestr("errors.txt", "\n".join(errors) + "\n")
+    except BaseException:
+        os.unlink(path)
+        raise
+    return Path(path)
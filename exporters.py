@@ -0,0 +1,471 @@
+"""PDF, Word and HTML rendering from one parsed document model
+
+The analysis markdown is parsed once into a list of blocks, which every
+backend renders; none of them looks at the markdown itself.
+"""
+import re
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+from html import escape
+from io import BytesIO
+
+from pdf_fonts import get_font_registry
+
+# kind is one of: heading, paragraph, bullet, numbered, table, rule, blank. level is a
+# heading's level (0 for a line that is all bold) or a numbered item's number; depth is
+# how deeply a list item is nested.
+Block = namedtuple('Block', ['kind', 'runs', 'level', 'rows', 'depth'], defaults=((), 0, (), 0))
+# link is a web or mail address, or None
+Run = namedtuple('Run', ['text', 'bold', 'italic', 'code', 'link'], defaults=(False, False, None))
+
+HEADING = re.compile(r"^(#{1,6})\s*(.*)$")
+BOLD_LINE = re.compile(r"^\*\*([^*]+)\*\*:?$")
+RULE = re.compile(r"^([-*_])(\s*\1){2,}$")
+BULLET = re.compile(r"^[-*+•]\s+(.*)$")
+NUMBERED = re.compile(r"^(\d{1,3})[.)]\s+(.*)$")
+TABLE_SEPARATOR = re.compile(r"^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?$")
+INLINE = re.compile(
+    r"`(?P<code>[^`]+)`"
+    r"|\[(?P<label>[^\]]+)\]\((?P<url>(?:[^()\s]|\([^()\s]*\))+)\)"
+    r"|\*\*\*(?P<bold_italic>.+?)\*\*\*"
+    r"|\*\*(?P<bold>.+?)\*\*|__(?P<bold_alt>.+?)__"
+    r"|\*(?P<italic>[^*\s](?:[^*]*?[^*\s])?)\*"
+    r"|(?<!\w)_(?P<italic_alt>[^_\s](?:[^_]*?[^_\s])?)_(?!\w)"
+)
+# Links to anything else (javascript:, data:) are kept as plain text
+SAFE_LINK = re.compile(r"^(https?:|mailto:)", re.IGNORECASE)
+
+FOOTER_TEXT = "Generated by LegalMitra - Your AI Legal Assistant | Powered by Google Gemini 2.5 Flash"
+
+
+def parse_runs(text, bold=False, italic=False):
+    """Split inline text into runs, marking bold, italic, `code` and [link](url) spans"""
+    runs = []
+    position = 0
+    for match in INLINE.finditer(text):
+        if match.start() > position:
+            runs.append(Run(text[position:match.start()], bold, italic))
+        kind = match.lastgroup
+        if kind == 'code':
+            runs.append(Run(match.group('code'), bold, italic, code=True))
+        elif kind == 'url':
+            link = match.group('url') if SAFE_LINK.match(match.group('url')) else None
+            runs.extend(run._replace(link=link) for run in parse_runs(match.group('label'), bold, italic))
+        elif kind == 'bold_italic':
+            runs.extend(parse_runs(match.group(kind), True, True))
+        elif kind in ('bold', 'bold_alt'):
+            runs.extend(parse_runs(match.group(kind), True, italic))
+        else:
+            runs.extend(parse_runs(match.group(kind), bold, True))
+        position = match.end()
+    if position < len(text):
+        runs.append(Run(text[position:], bold, italic))
+    return tuple(runs)
+
+
+def _is_table_row(line):
+    return line.startswith('|') or line.count('|') >= 2
+
+
+def _table_cells(line):
+    cells = [cell.strip() for cell in line.strip().split('|')]
+    # Leading/trailing pipes leave empty edge cells; inner empty cells are kept
+    if cells and not cells[0]:
+        cells = cells[1:]
+    if cells and not cells[-1]:
+        cells = cells[:-1]
+    return tuple(parse_runs(cell) for cell in cells)
+
+
+def iter_blocks(markdown):
+    """Parse markdown into document blocks in a single pass over its lines"""
+    table = []
+    # Indentation of each open level of the current list
+    list_indents = []
+    for raw_line in markdown.splitlines():
+        line = raw_line.strip()
+        indent = len(raw_line.expandtabs(4)) - len(raw_line.expandtabs(4).lstrip())
+        if table and not (line and _is_table_row(line)):
+            yield Block('table', rows=tuple(table))
+            table = []
+        is_list_item = not RULE.match(line) and (BULLET.match(line) or NUMBERED.match(line))
+        if is_list_item:
+            while list_indents and indent < list_indents[-1]:
+                list_indents.pop()
+            if not list_indents or indent > list_indents[-1]:
+                list_indents.append(indent)
+        elif line:
+            list_indents = []
+        depth = max(len(list_indents) - 1, 0)
+        if not line:
+            yield Block('blank')
+        elif _is_table_row(line):
+            cells = () if TABLE_SEPARATOR.match(line) else _table_cells(line)
+            # A bare "|" has no cells; a table made only of those would have no columns
+            if cells:
+                table.append(cells)
+        elif HEADING.match(line):
+            marks, text = HEADING.match(line).groups()
+            yield Block('heading', parse_runs(text.strip('*: ')), level=len(marks))
+        elif BOLD_LINE.match(line):
+            yield Block('heading', parse_runs(BOLD_LINE.match(line).group(1).strip()), level=0)
+        elif RULE.match(line):
+            yield Block('rule')
+        elif BULLET.match(line):
+            yield Block('bullet', parse_runs(BULLET.match(line).group(1)), depth=depth)
+        elif NUMBERED.match(line):
+            number, text = NUMBERED.match(line).groups()
+            yield Block('numbered', parse_runs(text), level=int(number), depth=depth)
+        else:
+            yield Block('paragraph', parse_runs(line))
+    if table:
+        yield Block('table', rows=tuple(table))
+
+
+@lru_cache(maxsize=32)
+def parse_document(markdown):
+    """Parsed blocks of an analysis, shared by every export of the same text"""
+    return tuple(iter_blocks(markdown))
+
+
+def _pdf_markup(runs, fonts):
+    """ReportLab paragraph markup for a sequence of runs"""
+    parts = []
+    for run in runs:
+        markup = fonts.markup(run.text, run.bold)
+        if run.italic:
+            markup = f"<i>{markup}</i>"
+        if run.code:
+            markup = f'<font face="Courier">{markup}</font>'
+        if run.link:
+            markup = f'<a href="{escape(run.link)}" color="blue">{markup}</a>'
+        parts.append(markup)
+    return "".join(parts)
+
+
+def render_pdf(case_scenario, analysis, case_id, report_date):
+    """Render a PDF report and return it as a BytesIO"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        topMargin=0.5*inch,
+        bottomMargin=0.5*inch,
+        leftMargin=0.75*inch,
+        rightMargin=0.75*inch
+    )
+
+    fonts = get_font_registry()
+    title_style = fonts.styles['title']
+    heading_style = fonts.styles['heading']
+    normal_style = fonts.styles['normal']
+    cell_style = fonts.styles['cell']
+    footer_style = fonts.styles['footer']
+
+    def list_style(depth):
+        # Nested list items are indented a step per level
+        if not depth:
+            return normal_style
+        return ParagraphStyle(f'LMList{depth}', parent=normal_style, leftIndent=18 * depth)
+
+    story = []
+
+    header_table = Table([[Paragraph("Legal Case Analysis Report", title_style)]], colWidths=[6.5*inch])
+    header_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#667eea')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('TOPPADDING', (0, 0), (-1, -1), 20),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 20),
+    ]))
+    story.append(header_table)
+    story.append(Spacer(1, 20))
+
+    info_table = Table([[Paragraph(f"<b>Case ID:</b> {fonts.markup(case_id)}", normal_style),
+                         Paragraph(f"<b>Date:</b> {fonts.markup(report_date)}", normal_style)]],
+                       colWidths=[3.25*inch, 3.25*inch])
+    info_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f0f9ff')),
+        ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#667eea')),
+        ('TOPPADDING', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+        ('LEFTPADDING', (0, 0), (-1, -1), 10),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+    ]))
+    story.append(info_table)
+    story.append(Spacer(1, 20))
+
+    story.append(Paragraph("Case Scenario", heading_style))
+    for para in case_scenario.split('\n'):
+        if para.strip():
+            story.append(Paragraph(fonts.markup(para), normal_style))
+    story.append(Spacer(1, 20))
+
+    story.append(Paragraph("Legal Analysis", heading_style))
+    for block in parse_document(analysis):
+        if block.kind == 'blank':
+            story.append(Spacer(1, 6))
+        elif block.kind == 'heading':
+            story.append(Paragraph(_pdf_markup(block.runs, fonts), heading_style))
+        elif block.kind == 'bullet':
+            story.append(Paragraph(f"• {_pdf_markup(block.runs, fonts)}", list_style(block.depth)))
+        elif block.kind == 'numbered':
+            story.append(Paragraph(f"{block.level}. {_pdf_markup(block.runs, fonts)}", list_style(block.depth)))
+        elif block.kind == 'rule':
+            story.append(HRFlowable(width="100%", thickness=0.5, color=colors.HexColor('#667eea'),
+                                    spaceBefore=6, spaceAfter=6))
+        elif block.kind == 'table':
+            columns = max(len(row) for row in block.rows)
+            data = [[Paragraph(_pdf_markup(cell, fonts), cell_style) for cell in row] + [""] * (columns - len(row))
+                    for row in block.rows]
+            table = Table(data, colWidths=[6.5*inch / columns] * columns, repeatRows=1)
+            table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e0e7ff')),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#667eea')),
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ]))
+            story.append(table)
+            story.append(Spacer(1, 10))
+        else:
+            story.append(Paragraph(_pdf_markup(block.runs, fonts), normal_style))
+
+    story.append(Spacer(1, 30))
+    footer_table = Table([[Paragraph(f"<i>{FOOTER_TEXT}</i>", footer_style)]], colWidths=[6.5*inch])
+    footer_table.setStyle(TableStyle([('ALIGN', (0, 0), (-1, -1), 'CENTER')]))
+    story.append(footer_table)
+
+    doc.build(story)
+    buffer.seek(0)
+    return buffer
+
+
+def render_docx(case_scenario, analysis, case_id, report_date):
+    """Render a Word report and return it as a BytesIO"""
+    from docx import Document
+    from docx.shared import Pt, RGBColor
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.oxml.ns import qn
+    from docx.oxml import OxmlElement
+
+    doc = Document()
+
+    # Set default font to support Unicode (especially Telugu/Hindi/Tamil)
+    style = doc.styles['Normal']
+    style.font.name = 'Noto Sans'
+    style.font.size = Pt(12)
+    rFonts = style.element.rPr.rFonts
+    for attribute in ('w:ascii', 'w:hAnsi', 'w:eastAsia', 'w:cs'):
+        rFonts.set(qn(attribute), 'Noto Sans')
+
+    def set_cell_background(cell, fill_color):
+        shading_elm = OxmlElement('w:shd')
+        shading_elm.set(qn('w:fill'), fill_color)
+        cell._element.get_or_add_tcPr().append(shading_elm)
+
+    def add_runs(paragraph, runs, size=None):
+        for index, data in enumerate(runs):
+            run = paragraph.add_run(data.text)
+            run.bold = data.bold or None
+            run.italic = data.italic or None
+            run.font.name = 'Courier New' if data.code else 'Noto Sans'
+            if size:
+                run.font.size = Pt(size)
+            if data.link:
+                run.font.underline = True
+                run.font.color.rgb = RGBColor(37, 99, 235)
+                # The address follows the link text, as in a printed reference
+                if index + 1 == len(runs) or runs[index + 1].link != data.link:
+                    add_runs(paragraph, [Run(f" ({data.link})", False)], size)
+
+    def add_rule():
+        paragraph = doc.add_paragraph()
+        borders = OxmlElement('w:pBdr')
+        bottom = OxmlElement('w:bottom')
+        for attribute, value in (('w:val', 'single'), ('w:sz', '6'), ('w:space', '1'), ('w:color', '667EEA')):
+            bottom.set(qn(attribute), value)
+        borders.append(bottom)
+        paragraph._p.get_or_add_pPr().append(borders)
+
+    def add_table(rows, header_fill):
+        columns = max(len(row) for row in rows)
+        table = doc.add_table(rows=len(rows), cols=columns)
+        table.style = 'Light Grid Accent 1'
+        for row_idx, row in enumerate(rows):
+            for col_idx, runs in enumerate(row):
+                cell = table.rows[row_idx].cells[col_idx]
+                if row_idx == 0:
+                    runs = [run._replace(bold=True) for run in runs]
+                    set_cell_background(cell, header_fill)
+                add_runs(cell.paragraphs[0], runs, size=11)
+        return table
+
+    header = doc.add_heading('', 0)
+    header_run = header.add_run('⚖️ Legal Case Analysis Report')
+    header_run.font.size = Pt(24)
+    header_run.font.color.rgb = RGBColor(102, 126, 234)
+    header_run.bold = True
+    header.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph()
+
+    info_table = doc.add_table(rows=3, cols=2)
+    info_table.style = 'Light Grid Accent 1'
+    hdr_cell = info_table.rows[0].cells[0].merge(info_table.rows[0].cells[1])
+    hdr_run = hdr_cell.paragraphs[0].add_run('Case Information')
+    hdr_run.font.bold = True
+    hdr_run.font.size = Pt(14)
+    hdr_run.font.name = 'Noto Sans'
+    hdr_run.font.color.rgb = RGBColor(255, 255, 255)
+    hdr_cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+    set_cell_background(hdr_cell, '667eea')
+    for row, (label, value) in zip(info_table.rows[1:], (('Case ID:', case_id), ('Date Generated:', report_date))):
+        add_runs(row.cells[0].paragraphs[0], [Run(label, True)])
+        add_runs(row.cells[1].paragraphs[0], [Run(value, False)])
+    doc.add_paragraph()
+
+    def add_section_heading(text):
+        heading = doc.add_heading(text, level=1)
+        heading.runs[0].font.color.rgb = RGBColor(118, 75, 162)
+
+    add_section_heading('Case Scenario')
+    add_runs(doc.add_paragraph(), [Run(case_scenario, False)])
+    doc.add_paragraph()
+
+    add_section_heading('Legal Analysis')
+    for block in parse_document(analysis):
+        if block.kind == 'blank':
+            continue
+        if block.kind == 'heading':
+            heading = doc.add_heading('', level=2)
+            add_runs(heading, block.runs)
+            for run in heading.runs:
+                run.font.color.rgb = RGBColor(102, 126, 234)
+        elif block.kind == 'bullet':
+            # The default template has bullet styles for three levels
+            style = 'List Bullet' if not block.depth else f'List Bullet {min(block.depth + 1, 3)}'
+            add_runs(doc.add_paragraph(style=style), block.runs)
+        elif block.kind == 'numbered':
+            # The model's own numbering is kept; Word's auto-numbering would restart it at 1
+            paragraph = doc.add_paragraph()
+            paragraph.paragraph_format.left_indent = Pt(18 * block.depth)
+            add_runs(paragraph, (Run(f"{block.level}. ", False),) + block.runs)
+        elif block.kind == 'rule':
+            add_rule()
+        elif block.kind == 'table':
+            add_table(block.rows, 'e0e7ff')
+            doc.add_paragraph()
+        else:
+            add_runs(doc.add_paragraph(), block.runs)
+
+    doc.add_paragraph()
+    doc.add_paragraph()
+    footer = doc.add_paragraph()
+    footer_run = footer.add_run(FOOTER_TEXT)
+    footer_run.italic = True
+    footer_run.font.size = Pt(9)
+    footer_run.font.color.rgb = RGBColor(128, 128, 128)
+    footer.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    buffer = BytesIO()
+    doc.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def _html_runs(runs):
+    parts = []
+    for run in runs:
+        html = escape(run.text)
+        if run.code:
+            html = f"<code>{html}</code>"
+        if run.italic:
+            html = f"<em>{html}</em>"
+        if run.bold:
+            html = f"<strong>{html}</strong>"
+        if run.link:
+            html = f'<a href="{escape(run.link)}" target="_blank">{html}</a>'
+        parts.append(html)
+    return "".join(parts)
+
+
+def render_html(analysis):
+    """Render an analysis as an HTML fragment for display in the app"""
+    parts = []
+    # Tags of the open (possibly nested) lists; each has an open <li>
+    open_lists = []
+    for block in parse_document(analysis):
+        if block.kind == 'blank':
+            continue
+        list_tag = {'bullet': 'ul', 'numbered': 'ol'}.get(block.kind)
+        depth = block.depth + 1 if list_tag else 0
+        while len(open_lists) > depth or (len(open_lists) == depth and depth and open_lists[-1] != list_tag):
+            parts.append(f"</li></{open_lists.pop()}>")
+        if list_tag:
+            if len(open_lists) == depth:
+                parts.append("</li>")
+            while len(open_lists) < depth:
+                parts.append(f"<{list_tag}>")
+                open_lists.append(list_tag)
+            # The model's own numbering is kept, as in the Word report
+            value = f' value="{block.level}"' if block.kind == 'numbered' else ""
+            parts.append(f"<li{value}>{_html_runs(block.runs)}")
+        elif block.kind == 'heading':
+            if block.level:
+                parts.append(f"<h{block.level}>{_html_runs(block.runs)}</h{block.level}>")
+            else:
+                parts.append(f"<p><strong>{_html_runs(block.runs)}</strong></p>")
+        elif block.kind == 'rule':
+            parts.append("<hr>")
+        elif block.kind == 'table':
+            header, *body = block.rows
+            parts.append("<table><thead><tr>" + "".join(f"<th>{_html_runs(cell)}</th>" for cell in header)
+                         + "</tr></thead><tbody>")
+            for row in body:
+                parts.append("<tr>" + "".join(f"<td>{_html_runs(cell)}</td>" for cell in row) + "</tr>")
+            parts.append("</tbody></table>")
+        else:
+            parts.append(f"<p>{_html_runs(block.runs)}</p>")
+    while open_lists:
+        parts.append(f"</li></{open_lists.pop()}>")
+    return "\n".join(parts)
+
+
+# Export format -> (MIME type, renderer)
+EXPORT_FORMATS = {
+    'docx': ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", render_docx),
+    'pdf': ("application/pdf", render_pdf),
+}
+
+
+def export_cache_key(case_id, version, export_format, language):
+    return f"{case_id}:v{version}:{export_format}:{language}"
+
+
+def export_file_name(case_data, export_format):
+    return f"LegalMitra_Analysis_{case_data['case_id']}_v{case_data['version']}.{export_format}"
+
+
+def render_case(case_data, export_format):
+    """Render a stored case record as report bytes"""
+    # Dated by the case's last update, so the same version always renders the same report
+    report_date = datetime.strptime(case_data['last_updated'], '%Y-%m-%d %H:%M:%S').strftime('%d-%m-%Y %H:%M')
+    _, renderer = EXPORT_FORMATS[export_format]
+    buffer = renderer(case_data['full_scenario'], case_data['analysis'], case_data['case_id'], report_date)
+    return buffer.getvalue()
+
+
+def get_case_export(case_data, export_format, cache):
+    """Report bytes for a case, reusing the cached copy of this version when there is one"""
+    key = export_cache_key(case_data['case_id'], case_data['version'], export_format, case_data['language'])
+    data = cache.get(key)
+    if data is None:
+        data = render_case(case_data, export_format)
+        cache.set(key, data)
+    return data
@@ -0,0 +1,305 @@
+"""Shared Gemini client used by every LegalMitra feature
+
+Importable without Streamlit so headless tools can reuse it. The Gemini SDK
+is slow to import, so it is only loaded once a client is actually created.
+"""
+import os
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+
+DEFAULT_MODEL = 'models/gemini-2.5-flash'
+
+# Per-key quota; defaults match the Gemini 2.5 Flash free tier
+REQUESTS_PER_MINUTE = int(os.environ.get("LEGALMITRA_RPM", "10"))
+TOKENS_PER_MINUTE = int(os.environ.get("LEGALMITRA_TPM", "250000"))
+# How long a request may wait in the queue for quota before giving up
+QUEUE_TIMEOUT_SECONDS = 120
+
+MAX_ATTEMPTS = 5
+# A pooled key that reports quota exhaustion is skipped for this long
+KEY_COOLDOWN_SECONDS = 60
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 32.0
+# Indic scripts take far more tokens per character than English text
+INDIC_CHARACTER = re.compile(r"[\u0900-\u0DFF]")
+CHARS_PER_TOKEN = 4
+INDIC_CHARS_PER_TOKEN = 1.5
+
+
+@lru_cache(maxsize=None)
+def retryable_errors():
+    """Errors worth retrying: 429s, 5xx and timeouts"""
+    from google.api_core import exceptions as api_exceptions
+    return (
+        api_exceptions.TooManyRequests,
+        api_exceptions.ResourceExhausted,
+        api_exceptions.ServiceUnavailable,
+        api_exceptions.InternalServerError,
+        api_exceptions.DeadlineExceeded,
+    )
+
+
+def is_quota_error(error):
+    """True for errors meaning the key's quota is used up"""
+    from google.api_core import exceptions as api_exceptions
+    return isinstance(error, (api_exceptions.TooManyRequests, api_exceptions.ResourceExhausted))
+
+
+class QuotaTimeoutError(Exception):
+    """Raised when a request waited longer than allowed for rate-limit quota"""
+
+
+def estimate_tokens(text):
+    """Rough token count of text, counting Indic-script characters separately"""
+    indic = len(INDIC_CHARACTER.findall(text))
+    return max(1, round((len(text) - indic) / CHARS_PER_TOKEN + indic / INDIC_CHARS_PER_TOKEN))
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously up to its per-minute capacity"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self):
+        """Tokens that could be taken right now"""
+        with self._lock:
+            self._refill()
+            return self.tokens
+
+    def acquire(self, amount=1, timeout=None):
+        """Block until amount tokens are available and take them"""
+        # A single request larger than the whole bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise QuotaTimeoutError("Rate limit queue timed out; please try again shortly")
+            time.sleep(min(wait, 1.0))
+
+    def adjust(self, amount):
+        """Take (or give back, if negative) tokens after the fact; may go into debt"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one API key"""
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def acquire(self, estimated_tokens, timeout=QUEUE_TIMEOUT_SECONDS):
+        """Wait for quota for one request of roughly estimated_tokens"""
+        started = time.monotonic()
+        self.requests.acquire(1, timeout)
+        remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+        self.tokens.acquire(estimated_tokens, remaining)
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """Correct the token reservation once the real usage is known"""
+        self.tokens.adjust(actual_tokens - estimated_tokens)
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+class GeminiClient:
+    """A Gemini model bound to one API key
+
+    ``genai.configure()`` sets the key for the whole process, so two sessions
+    with different keys would race each other. Each client instead owns its
+    own GenerativeServiceClient (and with it a reusable connection), which is
+    handed to the model in place of the process-wide default client.
+
+    Every request waits for quota from the key's RateLimiter and retryable
+    errors (429/5xx/timeouts) are retried with jittered exponential backoff.
+    Pass a dict as ``usage`` to have it filled with the request's
+    ``input_tokens``/``output_tokens`` once the response is complete.
+    """
+
+    def __init__(self, api_key, model_name=DEFAULT_MODEL, limiter=None, max_attempts=MAX_ATTEMPTS):
+        self.model_name = model_name
+        self.limiter = limiter or RateLimiter()
+        self.max_attempts = max_attempts
+        import google.generativeai as genai
+        from google.ai import generativelanguage as glm
+        self._service = glm.GenerativeServiceClient(client_options={'api_key': api_key})
+        self._model = genai.GenerativeModel(model_name)
+        # GenerativeModel only falls back to the global client when _client is unset
+        self._model._client = self._service
+
+    def generate(self, prompt, stream=False, usage=None):
+        """Return the response text, or an iterator of text chunks when stream=True"""
+        if not stream:
+            return self._generate(prompt, usage)
+        return self._stream(prompt, usage)
+
+    def _record_usage(self, estimated, response, text, usage):
+        metadata = getattr(response, 'usage_metadata', None)
+        if metadata is not None:
+            input_tokens = metadata.prompt_token_count or 0
+            output_tokens = metadata.candidates_token_count or 0
+            self.limiter.record_usage(estimated, input_tokens + output_tokens)
+        else:
+            input_tokens, output_tokens = estimated, estimate_tokens(text)
+        if usage is not None:
+            usage['input_tokens'] = input_tokens
+            usage['output_tokens'] = output_tokens
+
+    def _generate(self, prompt, usage):
+        estimated = estimate_tokens(prompt)
+        for attempt in range(self.max_attempts):
+            self.limiter.acquire(estimated)
+            try:
+                response = self._model.generate_content(prompt)
+                text = response.text
+            except retryable_errors():
+                if attempt == self.max_attempts - 1:
+                    raise
+                time.sleep(backoff_delay(attempt))
+                continue
+            self._record_usage(estimated, response, text, usage)
+            return text
+
+    def _stream(self, prompt, usage):
+        estimated = estimate_tokens(prompt)
+        for attempt in range(self.max_attempts):
+            self.limiter.acquire(estimated)
+            response = None
+            started = False
+            text = ""
+            try:
+                response = self._model.generate_content(prompt, stream=True)
+                for chunk in response:
+                    started = True
+                    text += chunk.text
+                    yield chunk.text
+            except retryable_errors():
+                # Once text has been shown, retrying would repeat it; let the caller handle the cut-off
+                if started or attempt == self.max_attempts - 1:
+                    raise
+                time.sleep(backoff_delay(attempt))
+                continue
+            self._record_usage(estimated, response, text, usage)
+            return
+
+
+def parse_api_keys(value):
+    """Split a comma/newline separated key list, dropping blanks and duplicates"""
+    keys = []
+    for key in value.replace("\n", ",").split(","):
+        key = key.strip()
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+class KeyPool:
+    """Balances requests across several operator-configured API keys
+
+    Exposes the same ``model_name``/``generate`` interface as GeminiClient.
+    Each request goes to a key chosen at random, weighted by the quota it has
+    left. A key that answers with a quota error is cooled down and the request
+    moves straight to another key; other retryable errors back off as usual.
+    """
+
+    def __init__(self, api_keys, model_name=DEFAULT_MODEL):
+        if not api_keys:
+            raise ValueError("KeyPool needs at least one API key")
+        self.model_name = model_name
+        # Retries are handled here so a throttled key can be swapped out immediately
+        self.clients = [GeminiClient(key, model_name, max_attempts=1) for key in api_keys]
+        self.cooldown_until = [0.0] * len(self.clients)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.clients)
+
+    def _weight(self, client):
+        requests = client.limiter.requests
+        tokens = client.limiter.tokens
+        return min(requests.available() / requests.capacity, tokens.available() / tokens.capacity)
+
+    def _pick(self):
+        """Return the index of the key to use next"""
+        with self._lock:
+            now = time.monotonic()
+            ready = [index for index, until in enumerate(self.cooldown_until) if until <= now]
+            if not ready:
+                # Everything is cooling down: wait for whichever key recovers first
+                index = min(range(len(self.clients)), key=self.cooldown_until.__getitem__)
+                delay = self.cooldown_until[index] - now
+            else:
+                weights = [self._weight(self.clients[index]) for index in ready]
+                if sum(weights) > 0:
+                    index = random.choices(ready, weights=weights)[0]
+                else:
+                    index = random.choice(ready)
+                delay = 0
+        if delay > 0:
+            time.sleep(delay)
+        return index
+
+    def _cool_down(self, index):
+        with self._lock:
+            self.cooldown_until[index] = time.monotonic() + KEY_COOLDOWN_SECONDS
+
+    def generate(self, prompt, stream=False, usage=None):
+        """Return the response text, or an iterator of text chunks when stream=True"""
+        if not stream:
+            return self._generate(prompt, usage)
+        return self._stream(prompt, usage)
+
+    def _handle_error(self, index, error, attempt):
+        """Cool down or back off after a retryable error, re-raising on the last attempt"""
+        if attempt == MAX_ATTEMPTS - 1:
+            raise error
+        if is_quota_error(error):
+            self._cool_down(index)
+        else:
+            time.sleep(backoff_delay(attempt))
+
+    def _generate(self, prompt, usage):
+        for attempt in range(MAX_ATTEMPTS):
+            index = self._pick()
+            try:
+                return self.clients[index].generate(prompt, usage=usage)
+            except retryable_errors() as e:
+                self._handle_error(index, e, attempt)
+
+    def _stream(self, prompt, usage):
+        for attempt in range(MAX_ATTEMPTS):
+            index = self._pick()
+            started = False
+            try:
+                for chunk in self.clients[index].generate(prompt, stream=True, usage=usage):
+                    started = True
+                    yield chunk
+                return
+            except retryable_errors() as e:
+                if started:
+                    raise
+                self._handle_error(index, e, attempt)
@@ -0,0 +1,157 @@
+"""PDF ingestion for the legal documents folder
+
+Workers run in a separate process pool, so everything here must stay
+importable without Streamlit.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from disk_cache import DiskCache, hash_file
+
+# Only the first pages of each PDF are used as legal context
+MAX_PAGES_PER_PDF = 30
+# Large PDFs are split into page ranges of this size so one file can use several cores
+PAGES_PER_TASK = 10
+# Extracted text is cached on disk by file content hash
+EXTRACT_CACHE_DIR = Path(".cache") / "extracted_text"
+EXTRACT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+
+def count_pages(pdf_path):
+    """Return the number of pages that will be extracted from a PDF"""
+    import PyPDF2
+    with open(pdf_path, 'rb') as file:
+        return min(MAX_PAGES_PER_PDF, len(PyPDF2.PdfReader(file).pages))
+
+
+def extract_pages(pdf_path, start, stop):
+    """Extract text from pages [start, stop) of a PDF"""
+    import PyPDF2
+    text = ""
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for page_num in range(start, min(stop, len(pdf_reader.pages))):
+            text += pdf_reader.pages[page_num].extract_text() + "\n\n"
+    return text
+
+
+def process_pdf(pdf_path):
+    """Extract text from PDF"""
+    try:
+        return extract_pages(pdf_path, 0, MAX_PAGES_PER_PDF)
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+def get_extract_cache():
+    """Return the on-disk cache of extracted PDF text"""
+    return DiskCache(EXTRACT_CACHE_DIR, EXTRACT_CACHE_MAX_BYTES)
+
+
+def _cache_key(digest):
+    # Changing the page limit changes the extracted text, so it is part of the key
+    return f"{digest}:{MAX_PAGES_PER_PDF}"
+
+
+def _plan_tasks(pdf_paths, cache):
+    """Split each uncached PDF into page-range tasks, recording per-file errors"""
+    tasks = []
+    results = []
+    for index, pdf_path in enumerate(pdf_paths):
+        results.append({'path': pdf_path, 'text': "", 'error': None, 'pending': 0,
+                        'cached': False, 'digest': None})
+        if cache is not None:
+            try:
+                results[index]['digest'] = hash_file(pdf_path)
+            except OSError as e:
+                results[index]['error'] = str(e)
+                continue
+            cached = cache.get(_cache_key(results[index]['digest']))
+            if cached is not None:
+                results[index]['text'] = cached.decode('utf-8')
+                results[index]['cached'] = True
+                continue
+        try:
+            page_count = count_pages(pdf_path)
+        except Exception as e:
+            results[index]['error'] = str(e)
+            continue
+        for start in range(0, page_count, PAGES_PER_TASK):
+            tasks.append((index, start, min(start + PAGES_PER_TASK, page_count)))
+            results[index]['pending'] += 1
+    return tasks, results
+
+
+def process_documents(pdf_paths, max_workers=None, on_progress=None, cache=None):
+    """Extract text from several PDFs in parallel
+
+    Returns one dict per input path ({'path', 'text', 'error', 'cached'}) in
+    the same order as ``pdf_paths``, so the assembled corpus is identical
+    between runs regardless of which worker finishes first. ``on_progress(done,
+    total, result)`` is called from the calling thread each time a file
+    completes. When a ``cache`` is given, unchanged files are served from it
+    and only new or modified files are extracted.
+    """
+    pdf_paths = list(pdf_paths)
+    tasks, results = _plan_tasks(pdf_paths, cache)
+    total = len(results)
+    done = 0
+    chunks = {}
+
+    def finish(index):
+        nonlocal done
+        result = results[index]
+        ranges = sorted(chunks.pop(index, {}).items())
+        if result['error'] is None and not result['cached']:
+            result['text'] = "".join(text for _, text in ranges)
+            if cache is not None and result['digest']:
+                cache.set(_cache_key(result['digest']), result['text'].encode('utf-8'))
+        done += 1
+        if on_progress:
+            on_progress(done, total, result)
+
+    # Cached files and files that failed while counting pages are already complete
+    for index, result in enumerate(results):
+        if result['pending'] == 0:
+            finish(index)
+
+    def collect(index, start, text=None, error=None):
+        result = results[index]
+        if error is not None and result['error'] is None:
+            result['error'] = error
+        elif text is not None:
+            chunks.setdefault(index, {})[start] = text
+        result['pending'] -= 1
+        if result['pending'] == 0:
+            finish(index)
+
+    workers = max_workers or os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+
+    if workers <= 1:
+        for index, start, stop in tasks:
+            try:
+                collect(index, start, text=extract_pages(pdf_paths[index], start, stop))
+            except Exception as e:
+                collect(index, start, error=str(e))
+    else:
+        # spawn keeps workers independent of the (multi-threaded) server process
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = {
+                executor.submit(extract_pages, str(pdf_paths[index]), start, stop): (index, start)
+                for index, start, stop in tasks
+            }
+            for future in as_completed(futures):
+                index, start = futures[future]
+                try:
+                    collect(index, start, text=future.result())
+                except Exception as e:
+                    collect(index, start, error=str(e))
+
+    for result in results:
+        del result['pending']
+        del result['digest']
+    return results
@@ -0,0 +1,115 @@
+"""Process-wide legal documents corpus shared read-only by all sessions
+
+The ./legal_documents folder is shared on disk, so its text and BM25 index
+are built once per process rather than once per session. A change to the
+folder (a file added, removed or rewritten) starts a rebuild in a background
+thread; sessions keep using the previous index until the new one is swapped
+in, so readers never see a half-built index.
+"""
+import threading
+import time
+from pathlib import Path
+
+from ingest import get_extract_cache, process_documents
+from retrieval import build_index
+
+LEGAL_DOCUMENTS_DIR = Path("legal_documents")
+# How often readers look at the folder for changes
+CHECK_INTERVAL_SECONDS = 5
+
+
+def directory_signature(directory):
+    """(name, size, mtime) of every PDF in a folder, sorted; cheap to compute"""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return ()
+    signature = []
+    for path in sorted(directory.glob("*.pdf")):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        signature.append((path.name, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+class LegalCorpus:
+    """Shared index over a documents folder, rebuilt in the background when it changes"""
+
+    def __init__(self, directory=LEGAL_DOCUMENTS_DIR, cache=None, max_workers=None):
+        self.directory = Path(directory)
+        self.cache = cache if cache is not None else get_extract_cache()
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._thread = None
+        self._checked_at = 0.0
+        # Everything below is replaced as a whole when a build finishes
+        self.index = None
+        self.signature = None
+        self.errors = []
+        self.cached_count = 0
+        self.document_count = 0
+        self.file_count = 0
+        # (files done, files total) of the running build
+        self.progress = (0, 0)
+
+    @property
+    def building(self):
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def refresh(self, force=False):
+        """Start a background rebuild if the folder changed; returns True if one is running
+
+        Without ``force`` the folder is looked at no more than once every
+        CHECK_INTERVAL_SECONDS, so this is cheap to call on every rerun.
+        """
+        with self._lock:
+            if self.building:
+                return True
+            now = time.monotonic()
+            if not force and now - self._checked_at < CHECK_INTERVAL_SECONDS:
+                return False
+            self._checked_at = now
+            signature = directory_signature(self.directory)
+            if signature == self.signature:
+                return False
+            self.progress = (0, len(signature))
+            self._thread = threading.Thread(target=self._build, args=(signature,),
+                                            name="legal-corpus-build", daemon=True)
+            self._thread.start()
+            return True
+
+    def current(self):
+        """The latest complete index (or None), starting a rebuild if the folder changed"""
+        self.refresh()
+        return self.index
+
+    def wait(self, timeout=None):
+        """Block until the running build (if any) finishes; returns False on timeout"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def _build(self, signature):
+        def report_progress(done, total, result):
+            self.progress = (done, total)
+
+        pdf_files = [self.directory / name for name, _, _ in signature]
+        try:
+            results = process_documents(pdf_files, max_workers=self.max_workers,
+                                        on_progress=report_progress, cache=self.cache)
+            index = build_index((result['path'].name, result['text']) for result in results if result['text'])
+        except Exception as e:
+            # Keep serving the previous index; the next change to the folder retries
+            self.errors = [(str(self.directory), str(e))]
+            self.signature = signature
+            return
+        self.errors = [(result['path'].name, result['error']) for result in results if result['error']]
+        self.cached_count = sum(1 for result in results if result['cached'])
+        self.document_count = sum(1 for result in results if result['text'])
+        self.file_count = len(results)
+        self.index = index
+        self.signature = signature
@@ -0,0 +1,179 @@
+"""Process-wide ReportLab fonts and paragraph styles for PDF exports
+
+Fonts are looked up and registered once per process. ReportLab embeds only
+the glyphs a document uses, so the large Noto files stay cheap per export.
+Each text run is split by script and set in the font for that script, so a
+Hindi scenario with English section numbers uses the right glyphs for both.
+Indic scripts also need shaping (vowel-sign reordering and conjuncts), which
+ReportLab only does when uharfbuzz is installed and the paragraph's own
+(base) font is a TrueType font; without both those scripts count as missing.
+"""
+import os
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+# Candidate files per script, best first; Latin text uses the base font
+FONT_FILES = {
+    'Latin': (['NotoSans-Regular.ttf', 'DejaVuSans.ttf'], ['NotoSans-Bold.ttf', 'DejaVuSans-Bold.ttf']),
+    'Devanagari': (['NotoSansDevanagari-Regular.ttf', 'Lohit-Devanagari.ttf', 'Mangal.ttf'],
+                   ['NotoSansDevanagari-Bold.ttf']),
+    'Telugu': (['NotoSansTelugu-Regular.ttf', 'Lohit-Telugu.ttf', 'Gautami.ttf'], ['NotoSansTelugu-Bold.ttf']),
+    'Tamil': (['NotoSansTamil-Regular.ttf', 'Lohit-Tamil.ttf', 'Latha.ttf'], ['NotoSansTamil-Bold.ttf']),
+}
+FONT_DIRS = [directory for directory in (
+    os.environ.get("LEGALMITRA_FONT_DIR"),
+    "fonts",
+    "~/.fonts",
+    "~/.local/share/fonts",
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    "/Library/Fonts",
+    "C:/Windows/Fonts",
+) if directory]
+# Built into ReportLab; covers Latin only
+FALLBACK_FONT = 'Helvetica'
+
+# Scripts that need shaping to render correctly
+COMPLEX_SCRIPTS = frozenset({'Devanagari', 'Telugu', 'Tamil'})
+
+SCRIPT_RUN = re.compile(r"([\u0900-\u097F]+|[\u0B80-\u0BFF]+|[\u0C00-\u0C7F]+)")
+
+
+def script_of(text):
+    """Name of the Indic script text starts with, or 'Latin'"""
+    code = ord(text[0]) if text else 0
+    if 0x0900 <= code <= 0x097F:
+        return 'Devanagari'
+    if 0x0B80 <= code <= 0x0BFF:
+        return 'Tamil'
+    if 0x0C00 <= code <= 0x0C7F:
+        return 'Telugu'
+    return 'Latin'
+
+
+def shaping_available():
+    """Whether ReportLab can shape complex scripts (needs uharfbuzz)"""
+    try:
+        import uharfbuzz  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def find_font_files(directories=FONT_DIRS):
+    """Map lower-cased font file names to paths under the given directories"""
+    found = {}
+    for directory in directories:
+        root = Path(directory).expanduser()
+        if not root.is_dir():
+            continue
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.lower().endswith(('.ttf', '.otf')):
+                    found.setdefault(filename.lower(), os.path.join(dirpath, filename))
+    return found
+
+
+class FontRegistry:
+    """Registered fonts per script plus the paragraph styles built on them"""
+
+    def __init__(self, directories=FONT_DIRS):
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        available = find_font_files(directories)
+        self.fonts = {}
+        self.paths = {}
+        for script, (regular_files, bold_files) in FONT_FILES.items():
+            regular = next((available[name.lower()] for name in regular_files if name.lower() in available), None)
+            if regular is None:
+                continue
+            bold = next((available[name.lower()] for name in bold_files if name.lower() in available), None)
+            name = f"LegalMitra-{script}"
+            try:
+                pdfmetrics.registerFont(TTFont(name, regular))
+                bold_name = name
+                if bold:
+                    bold_name = f"{name}-Bold"
+                    pdfmetrics.registerFont(TTFont(bold_name, bold))
+            except Exception:
+                # Unreadable or unsupported (e.g. CFF-based .otf) font file
+                continue
+            # Lets <b> inside a paragraph switch to the bold face (or stay regular)
+            pdfmetrics.registerFontFamily(name, normal=name, bold=bold_name, italic=name, boldItalic=bold_name)
+            self.fonts[script] = name
+            self.paths[script] = regular
+        self.base_font = self.fonts.get('Latin', FALLBACK_FONT)
+        # ReportLab shapes a paragraph only if its style's font is shapable; per-run
+        # <font face> fonts do not count, and the Type 1 fallback never is
+        self.shaping = 'Latin' in self.fonts and shaping_available()
+        self.styles = self._build_styles()
+
+    def _build_styles(self):
+        from reportlab.lib import colors
+        from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+
+        sample = getSampleStyleSheet()
+        base = self.base_font
+        # Paragraph shaping is off by default; it is a no-op for fonts or text that do not need it
+        shaping = 1 if self.shaping else 0
+        styles = {
+            'title': ParagraphStyle(
+                'LMTitle', parent=sample['Heading1'], fontSize=24,
+                textColor=colors.HexColor('#667eea'), spaceAfter=20, alignment=1, fontName=base),
+            'heading': ParagraphStyle(
+                'LMHeading', parent=sample['Heading2'], fontSize=14,
+                textColor=colors.HexColor('#764ba2'), spaceAfter=10, spaceBefore=15, fontName=base, leading=20),
+            'normal': ParagraphStyle(
+                'LMNormal', parent=sample['Normal'], fontSize=11, fontName=base, leading=16, spaceAfter=8),
+            'footer': ParagraphStyle(
+                'LMFooter', parent=sample['Normal'], fontSize=9, textColor=colors.grey, alignment=1, fontName=base),
+        }
+        styles['cell'] = ParagraphStyle('LMCell', parent=styles['normal'], fontSize=9, leading=12, spaceAfter=0)
+        for style in styles.values():
+            style.shaping = shaping
+        return styles
+
+    def missing_scripts(self, text):
+        """Indic scripts used in text that the PDF cannot render correctly
+
+        A script is missing when no font for it is installed or, for scripts
+        that need shaping, when uharfbuzz or a Latin TrueType base font is not
+        available.
+        """
+        supported = set(self.fonts)
+        if not self.shaping:
+            supported -= COMPLEX_SCRIPTS
+        return sorted({script_of(run) for run in SCRIPT_RUN.findall(text)} - supported)
+
+    def markup(self, text, bold=False):
+        """Escaped paragraph markup with each script run set in its own font"""
+        parts = []
+        for run in SCRIPT_RUN.split(text):
+            if not run:
+                continue
+            script = script_of(run)
+            run = escape(run)
+            if script != 'Latin' and script in self.fonts:
+                run = f'<font face="{self.fonts[script]}">{run}</font>'
+            parts.append(run)
+        markup = "".join(parts)
+        return f"<b>{markup}</b>" if bold else markup
+
+
+_registry_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _load_registry():
+    return FontRegistry()
+
+
+def get_font_registry():
+    """The process-wide FontRegistry, created on first use"""
+    # Registration touches ReportLab's global font tables, so only one thread does it
+    with _registry_lock:
+        return _load_registry()
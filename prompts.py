@@ -0,0 +1,106 @@
+"""Prompt templates shared by the Streamlit app and headless tools"""
+
+# Evidence updates carry a rolling case-state summary instead of the whole
+# history, so every update prompt stays the same size.
+CASE_STATE_MARKER = "=== UPDATED CASE STATE ==="
+CASE_STATE_WORDS = 250
+# Hard cap on a stored summary in case the model ignores the word limit
+CASE_STATE_MAX_CHARS = 4000
+# The first update has no summary yet and starts from the head of the analysis
+CASE_STATE_SEED_CHARS = 6000
+
+# Languages a case can be analyzed in; English needs no language instruction
+LANGUAGES = ['English', 'Hindi', 'Telugu', 'Tamil']
+
+ANALYSIS_LANGUAGE_INSTRUCTIONS = {
+    'Hindi': "Provide the analysis in Hindi (Devanagari script).",
+    'Telugu': "Provide the analysis in Telugu (Telugu script).",
+    'Tamil': "Provide the analysis in Tamil (Tamil script).",
+}
+
+UPDATE_LANGUAGE_INSTRUCTIONS = {
+    'Hindi': "Provide update in Hindi.",
+    'Telugu': "Provide update in Telugu.",
+    'Tamil': "Provide update in Tamil.",
+}
+
+
+def build_analysis_prompt(case_scenario, legal_context, language='English'):
+    """Prompt for the full 9-section case analysis"""
+    lang_instruction = ANALYSIS_LANGUAGE_INSTRUCTIONS.get(language, "")
+    return f"""You are an expert Indian legal analyst. {lang_instruction}
+
+CASE: {case_scenario}
+
+LEGAL REFERENCE: {legal_context if legal_context else "Use IPC, CrPC, Evidence Act knowledge."}
+
+Provide comprehensive analysis:
+
+1. CASE CLASSIFICATION
+2. RELEVANT LEGAL PROVISIONS (section numbers)
+3. PUNISHMENT DETAILS:
+   - Each applicable section
+   - Minimum punishment
+   - Maximum punishment
+   - Cognizable/Non-cognizable
+   - Bailable/Non-bailable
+4. PROSECUTION ARGUMENTS (4-5 points)
+5. DEFENSE ARGUMENTS (4-5 points)
+6. KEY LEGAL FACTORS
+7. EVIDENCE REQUIREMENTS
+8. SIMILAR PRECEDENTS
+9. RISK ASSESSMENT
+
+Format clearly with headings."""
+
+
+def build_evidence_prompt(case_state, new_evidence, language='English'):
+    """Prompt for the impact of new evidence, also asking for the updated case state
+
+    ``case_state`` is the rolling summary from the previous update, or the
+    original analysis (clipped to CASE_STATE_SEED_CHARS) for the first one.
+    """
+    lang_instruction = UPDATE_LANGUAGE_INSTRUCTIONS.get(language, "")
+    return f"""{lang_instruction}
+
+CASE STATE (analysis and evidence so far): {case_state[:CASE_STATE_SEED_CHARS]}
+
+NEW EVIDENCE: {new_evidence}
+
+Analyze impact:
+1. IMPACT ASSESSMENT
+2. HOW IT AFFECTS PUNISHMENT
+3. EFFECT ON PROSECUTION
+4. EFFECT ON DEFENSE
+5. UPDATED RISK ASSESSMENT
+
+Then write a line containing only {CASE_STATE_MARKER} followed by the updated
+case state in at most {CASE_STATE_WORDS} words: charges and sections, key
+facts, every piece of evidence so far (one line each, including this one) with
+its effect, and the current risk assessment. Write it in English."""
+
+
+def parse_evidence_response(text, previous_state, new_evidence):
+    """Split an evidence response into (impact_analysis, case_state)
+
+    If the model left out the case state, the new evidence is appended to the
+    previous state so it is not lost from later updates.
+    """
+    impact, marker, state = text.partition(CASE_STATE_MARKER)
+    state = state.strip()
+    if not marker or not state:
+        state = f"{previous_state}\n- {new_evidence}"
+    # Keep the tail: the newest evidence matters most to the next update
+    return impact.strip(), state[-CASE_STATE_MAX_CHARS:]
+
+
+def build_precedents_prompt(case_scenario):
+    """Prompt for a list of similar Indian precedents"""
+    return f"""Find similar Indian legal precedents for: {case_scenario}
+
+List 5-7 relevant precedents with:
+1. Case name
+2. Year
+3. Court
+4. Key principle
+5. Relevance"""
@@ -0,0 +1,76 @@
+"""Disk-backed cache of Gemini case analyses"""
+import json
+import threading
+import time
+from pathlib import Path
+
+from disk_cache import DiskCache, hash_bytes
+
+RESPONSE_CACHE_DIR = Path(".cache") / "responses"
+RESPONSE_CACHE_MAX_BYTES = 50 * 1024 * 1024
+RESPONSE_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+
+def normalize_scenario(case_scenario):
+    """Collapse whitespace and case so trivially different resubmissions share a key"""
+    return " ".join(case_scenario.split()).casefold()
+
+
+def make_cache_key(case_scenario, legal_context, language, model_name):
+    """Build the cache key for one analysis request"""
+    parts = [
+        normalize_scenario(case_scenario),
+        hash_bytes((legal_context or "").encode('utf-8')),
+        language,
+        model_name,
+    ]
+    return hash_bytes(json.dumps(parts, ensure_ascii=False).encode('utf-8'))
+
+
+class ResponseCache:
+    """LRU + TTL cache of response text with hit/miss counters"""
+
+    def __init__(self, directory=RESPONSE_CACHE_DIR, max_bytes=RESPONSE_CACHE_MAX_BYTES,
+                 ttl_seconds=RESPONSE_CACHE_TTL_SECONDS):
+        self.store = DiskCache(directory, max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        """Return the cached text for key, or None if missing or expired"""
+        data = self.store.get(key)
+        entry = None
+        if data is not None:
+            try:
+                entry = json.loads(data.decode('utf-8'))
+            except ValueError:
+                entry = None
+            if entry is None or time.time() - entry['created'] > self.ttl_seconds:
+                self.store.delete(key)
+                entry = None
+        self._count(entry is not None)
+        return entry['text'] if entry else None
+
+    def set(self, key, text):
+        """Store response text for key"""
+        entry = {'created': time.time(), 'text': text}
+        self.store.set(key, json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+
+    def stats(self):
+        """Return hit/miss counters for display"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total) if total else 0.0,
+            }
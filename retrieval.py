@@ -0,0 +1,127 @@
+"""Section-aware chunking and BM25 retrieval over the legal documents corpus"""
+import math
+import re
+from collections import Counter
+
+# Number of passages pulled into each analysis prompt
+TOP_K = 6
+# Upper bound on the characters of legal reference text sent with a prompt
+MAX_CONTEXT_CHARS = 6000
+# Sections longer than this are split further on line boundaries
+MAX_CHUNK_CHARS = 1500
+# Joins passages in the assembled context, best match first
+PASSAGE_SEPARATOR = "\n\n---\n\n"
+
+# Bare acts and judgments start sections with "CHAPTER XVII", "Section 420",
+# "420. Cheating.—" or "Article 21"
+SECTION_HEADING = re.compile(
+    r"^\s*(?:(?:chapter|part|section|article|schedule|order|rule)\s+[\dIVXLC]+[A-Z]?\b"
+    r"|\d{1,4}[A-Z]{0,2}\.\s+\S)",
+    re.IGNORECASE,
+)
+# \w misses Indic vowel signs, so whole script blocks are matched explicitly
+TOKEN = re.compile(r"[\w\u0900-\u0DFF]+")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have he her his in is it its of on or
+that the their them they this to was were which who whom will with shall any
+such not no other under said
+""".split())
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+
+def tokenize(text):
+    """Lower-case word tokens without stopwords"""
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def chunk_document(text, source, max_chars=MAX_CHUNK_CHARS):
+    """Split a document into passages that start at section headings"""
+    sections = []
+    current = []
+    for line in text.splitlines():
+        if SECTION_HEADING.match(line) and current:
+            sections.append(current)
+            current = []
+        if line.strip():
+            current.append(line.strip())
+    if current:
+        sections.append(current)
+
+    chunks = []
+    for lines in sections:
+        heading = lines[0][:120]
+        piece = []
+        size = 0
+        for line in lines:
+            if piece and size + len(line) > max_chars:
+                chunks.append({'source': source, 'heading': heading, 'text': "\n".join(piece)})
+                piece = []
+                size = 0
+            piece.append(line)
+            size += len(line) + 1
+        if piece:
+            chunks.append({'source': source, 'heading': heading, 'text': "\n".join(piece)})
+    return chunks
+
+
+class LegalIndex:
+    """BM25 inverted index over document chunks"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.postings = {}
+        self.lengths = []
+        for chunk_id, chunk in enumerate(chunks):
+            terms = Counter(tokenize(chunk['heading'] + "\n" + chunk['text']))
+            self.lengths.append(sum(terms.values()))
+            for term, frequency in terms.items():
+                self.postings.setdefault(term, []).append((chunk_id, frequency))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def idf(self, term):
+        document_frequency = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.chunks) - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(self, query, k=TOP_K):
+        """Return up to k (score, chunk) pairs ranked by BM25"""
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for chunk_id, frequency in postings:
+                norm = K1 * (1 - B + B * self.lengths[chunk_id] / self.avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+        # Ties are broken by corpus position so results are deterministic
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(score, self.chunks[chunk_id]) for chunk_id, score in ranked]
+
+
+def build_index(documents):
+    """Build a LegalIndex from (source name, text) pairs"""
+    chunks = []
+    for source, text in documents:
+        chunks.extend(chunk_document(text, source))
+    return LegalIndex(chunks)
+
+
+def retrieve_context(index, query, k=TOP_K, max_chars=MAX_CONTEXT_CHARS):
+    """Return the passages most relevant to query, formatted for a prompt"""
+    if index is None or not len(index):
+        return ""
+    passages = []
+    size = 0
+    for _, chunk in index.search(query, k):
+        passage = f"[{chunk['source']}]\n{chunk['text']}"
+        if passages and size + len(passage) > max_chars:
+            break
+        passages.append(passage[:max_chars])
+        size += len(passage)
+    return PASSAGE_SEPARATOR.join(passages)
@@ -0,0 +1,97 @@
+"""Shared key/value state for running several LegalMitra replicas
+
+Each replica keeps its own SQLite case store for listing and search. Cases
+are also published to a shared backend, so a case ID created on one replica
+resolves on any other. Backends only need a Redis-like get/set/delete of
+bytes, so a Redis client can be dropped in behind the same interface.
+
+Pick a backend with LEGALMITRA_STATE_BACKEND:
+
+- unset: no sharing (single replica)
+- ``sqlite``: a SQLite file every replica can reach (LEGALMITRA_STATE_PATH)
+- ``memory``: an in-process stand-in for Redis, for tests and local runs
+"""
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+STATE_DB_PATH = Path(os.environ.get("LEGALMITRA_STATE_PATH", "legalmitra_state.db"))
+# How long a writer waits for another replica's write lock on the SQLite backend
+SQLITE_BUSY_TIMEOUT_SECONDS = 10
+
+
+class StateBackend:
+    """Interface for shared state: bytes values under string keys"""
+
+    def get(self, key):
+        """Return the value stored under key, or None"""
+        raise NotImplementedError
+
+    def set(self, key, value):
+        """Store value (bytes) under key, replacing any previous value"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Remove key if present"""
+        raise NotImplementedError
+
+
+class MemoryStateBackend(StateBackend):
+    """In-process stand-in for Redis GET/SET/DEL"""
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._values.get(key)
+
+    def set(self, key, value):
+        with self._lock:
+            self._values[key] = bytes(value)
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+
+class SQLiteStateBackend(StateBackend):
+    """Key/value table in a SQLite file shared by replicas on the same host or volume"""
+
+    def __init__(self, path=STATE_DB_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=SQLITE_BUSY_TIMEOUT_SECONDS,
+                                     check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO state (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value", (key, bytes(value)))
+
+    def delete(self, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM state WHERE key = ?", (key,))
+
+
+def open_state_backend(name=None):
+    """Open the backend named by ``name`` or LEGALMITRA_STATE_BACKEND; None when sharing is off"""
+    name = (name if name is not None else os.environ.get("LEGALMITRA_STATE_BACKEND", "")).strip().lower()
+    if not name:
+        return None
+    if name == 'sqlite':
+        return SQLiteStateBackend()
+    if name == 'memory':
+        return MemoryStateBackend()
+    raise ValueError(f"Unknown state backend: {name}")
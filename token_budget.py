@@ -0,0 +1,70 @@
+"""Per-feature prompt token budgets, checked before anything is sent to Gemini"""
+import os
+
+from gemini_client import estimate_tokens
+from retrieval import PASSAGE_SEPARATOR
+
+# Input token budget per feature; override with e.g. LEGALMITRA_ANALYSIS_TOKEN_BUDGET
+TOKEN_BUDGETS = {
+    feature: int(os.environ.get(f"LEGALMITRA_{feature.upper()}_TOKEN_BUDGET", default))
+    for feature, default in (('analysis', 8000), ('evidence', 4000), ('precedents', 2000))
+}
+
+
+class TokenBudgetError(ValueError):
+    """Raised when a prompt cannot be brought within its feature's budget"""
+
+
+def check_budget(prompt, feature):
+    """Return the prompt's estimated token count, raising if it is over budget"""
+    tokens = estimate_tokens(prompt)
+    budget = TOKEN_BUDGETS[feature]
+    if tokens > budget:
+        raise TokenBudgetError(
+            f"Input is too long: about {tokens:,} tokens against a {budget:,} token limit. "
+            "Please shorten it.")
+    return tokens
+
+
+def fit_context(make_prompt, legal_context, feature):
+    """Drop the lowest-ranked context passages until the prompt fits the budget
+
+    ``make_prompt`` builds the full prompt from a context string. Passages are
+    in retrieval order, so the best matches are kept. Returns (prompt,
+    legal_context, estimated_tokens) for the trimmed context.
+    """
+    passages = legal_context.split(PASSAGE_SEPARATOR) if legal_context else []
+    budget = TOKEN_BUDGETS[feature]
+    while True:
+        legal_context = PASSAGE_SEPARATOR.join(passages)
+        prompt = make_prompt(legal_context)
+        tokens = estimate_tokens(prompt)
+        if tokens <= budget or not passages:
+            break
+        passages.pop()
+    # Without any context left, the remaining text is the user's own input
+    check_budget(prompt, feature)
+    return prompt, legal_context, tokens
+
+
+def fit_text(make_prompt, text, feature, keep_end=False):
+    """Clip ``text`` until the prompt fits the budget
+
+    For text the user cannot shorten, such as a stored analysis, or that is
+    only background for the feature. The head of ``text`` is kept, or its end
+    with ``keep_end``. Returns (prompt, text, estimated_tokens); if the
+    prompt is still over budget with no text left, the rest is the user's own
+    input and TokenBudgetError is raised.
+    """
+    budget = TOKEN_BUDGETS[feature]
+    prompt = make_prompt(text)
+    tokens = estimate_tokens(prompt)
+    while tokens > budget and text:
+        # Cut in proportion to the overshoot, so this takes one or two passes
+        keep = int(len(text) * (1 - (tokens - budget) / estimate_tokens(text)))
+        keep = max(0, min(keep, len(text) - 1))
+        text = text[len(text) - keep:] if keep_end else text[:keep]
+        prompt = make_prompt(text)
+        tokens = estimate_tokens(prompt)
+    check_budget(prompt, feature)
+    return prompt, text, tokens